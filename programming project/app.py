@@ -11,16 +11,31 @@ Author: Destyny Ho
 '''
 import logging
 import csv
+import hashlib
 import json
+import os
 from datetime import datetime, timedelta
-from threading import Timer
-from flask import Flask, render_template, request, Markup
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from flask import Flask, Response, render_template, request, make_response, jsonify, g, Markup
 from covid_data_handler import (parse_csv_data, process_covid_csv_data,
-                                covid_API_request)
-from covid_news_handling import update_news
+                                covid_API_requests_batched,
+                                load_covid_snapshot)
+from covid_news_handling import update_news, get_article_store
+from covid_analytics import area_analytics, analytics_page
+from update_scheduler import UpdateScheduler
+from refresh_coalescer import RefreshCoalescer
+from live_updates import LiveUpdates
+from shared_state import SharedState
+from dashboard_state import StateHolder, frozen
+from metrics import registry, span, Counter, Collected, Histogram
+from structured_logging import setup_logging
+from http_session import http_client
+
+import_started = perf_counter()
+startup_time = None
 
 app = Flask(__name__)
-logging.basicConfig(filename='sys.log', filemode='w', format='%(name)s - %(levelname)s - %(message)s', level = logging.DEBUG)
 
 with open('config.json', encoding="utf8") as json_file:
     data = json.load(json_file)
@@ -28,35 +43,243 @@ with open('config.json', encoding="utf8") as json_file:
     covid_location_type = data["location type"]
     nation_location = data["nation location"]
     nation_location_type = data["nation location type"]
+    extra_areas = [(area["location"], area["location type"]) for area in data.get("extra areas", [])]
+    refresh_freshness = data.get("refresh freshness seconds", 60)
+    shared_state_file = data.get("shared state file", "")
+    log_level = data.get("log level", "DEBUG")
+    log_max_bytes = data.get("log max bytes", 5_000_000)
+    log_backup_count = data.get("log backup count", 5)
+    log_rotate_when = data.get("log rotate when", "")
+    log_format = data.get("log format", "text")
+    populations = data.get("populations", {})
+
+setup_logging('sys.log', log_level, max_bytes=log_max_bytes, backup_count=log_backup_count,
+              when=log_rotate_when or None, json_lines=(log_format == 'json'))
+
+covid_areas = [(covid_location, covid_location_type), (nation_location, nation_location_type)] + extra_areas
 
-threads = []
-update_tracking = []
-list_of_updates = []
-deleted_articles = []
+scheduler = UpdateScheduler()
+coalescer = RefreshCoalescer(refresh_freshness)
+live = LiveUpdates()
+rendered_pages = {}
+request_seconds = registry.register(Histogram('covid_dashboard_request_seconds',
+                                              'Time taken to answer requests, in seconds.', ('endpoint',)))
+requests_answered = registry.register(Counter('covid_dashboard_requests_total',
+                                              'Requests answered.', ('endpoint', 'status')))
+registry.register(Collected('covid_dashboard_upstream_calls_total', 'Refreshes which called an API.', 'counter',
+                            ('kind',), lambda: {(kind,): stats['upstream_calls'] for kind, stats in coalescer.stats().items()}))
+registry.register(Collected('covid_dashboard_upstream_calls_saved_total', 'Refreshes which reused another refresh.',
+                            'counter', ('kind',),
+                            lambda: {(kind,): stats['calls_saved'] for kind, stats in coalescer.stats().items()}))
+registry.register(Collected('covid_dashboard_http_not_modified_total', 'API responses which had not changed.',
+                            'counter', (), lambda: {(): http_client.not_modified}))
+registry.register(Collected('covid_dashboard_live_subscribers', 'Open pages receiving pushed changes.',
+                            'gauge', (), lambda: {(): len(live)}))
+registry.register(Collected('covid_dashboard_live_messages_total', 'Changes pushed to open pages.',
+                            'counter', (), lambda: {(): live.messages_sent}))
+registry.register(Collected('covid_dashboard_state_version', 'Number of changes made to the dashboard data.',
+                            'gauge', (), lambda: {(): state.get().version}))
+#With a shared state file, the web workers show the values published by the fetcher process (fetcher.py).
+shared_state = SharedState(shared_state_file) if shared_state_file else None
+is_fetcher = False
+shared_version = None
+shared_lock = Lock()
+shared_follower = None
 
-def get_local_infections():
+def get_infections():
     '''
-    Gets the local infection rates of the last seven days.
-    
-    Returns this value.
+    Gets the infection rates of the local area, the nation and any extra areas
+    from the config file at the same time, with one query per area type.
+
+    Returns a dictionary of the covid updates of each location.
     '''
-    covid_local = covid_API_request(covid_location, covid_location_type)
-    covid_cases = covid_local['last7']
-    logging.info('Infection rates fetched.')
-    return covid_cases
+    started = perf_counter()
+    updates = covid_API_requests_batched(covid_areas)
+    logging.info('Infection rates fetched for %s areas.', len(updates), extra={'duration': perf_counter() - started})
+    return updates
 
-def get_national_infections():
+def live_values(current) -> dict:
     '''
-    Gets the national infection rates, hospital cases and death rates.
-    
-    Returns these values.
+    Gets the values shown on the dashboard, keyed by the names used in the template.
+
+    Parameters:
+        - current (DashboardState): The dashboard snapshot.
+    '''
+    return {'local_7day_infections': current.local_infections,
+            'area_7day_infections': {area: updates['last7'] for area, updates in current.area_updates.items()},
+            'national_7day_infections': current.national_infections,
+            'hospital_cases': current.hospital_cases,
+            'deaths_total': current.deaths,
+            'news_articles': list(current.articles.values()),
+            'updates': list(current.updates.values())}
+
+def state_changed(new_state):
+    '''
+    Pushes the values of a new dashboard snapshot to the open pages and, in the fetcher process, to the web workers.
+    The page cache is keyed by the snapshot's version, so the page is rendered again on the next request.
+
+    Parameters:
+        - new_state (DashboardState): The new dashboard snapshot.
+    '''
+    live.publish(live_values(new_state))
+    if is_fetcher:
+        shared_state.publish(shared_values(new_state))
+
+#The dashboard data: request handlers read the current snapshot, and every change swaps in a new one.
+state = StateHolder(on_change=state_changed)
+
+def shared_values(current) -> dict:
+    '''
+    Gets the dashboard data the fetcher process publishes to the web workers.
+
+    Parameters:
+        - current (DashboardState): The dashboard snapshot.
+    '''
+    return {'area_updates': dict(current.area_updates),
+            'articles': [{'title': article['title'], 'content': str(article['content'])}
+                         for article in current.articles.values()],
+            'updates': list(current.updates.values())}
+
+def from_shared_values(current, values: dict):
+    '''
+    Builds a snapshot showing the dashboard data published by the fetcher process.
+
+    Parameters:
+        - current (DashboardState): The dashboard snapshot.
+        - values (dictionary): The published data, as given by shared_values.
+
+    Returns the new snapshot.
+    '''
+    #The article contents were formatted by format_article, so their links are kept as markup.
+    articles = {article['title']: {'title': article['title'], 'content': Markup(article['content'])}
+                for article in values.get('articles', [])}
+    updates = {update['title']: update for update in values.get('updates', [])}
+    return with_covid_updates(current, values.get('area_updates', {}))._replace(
+        articles=frozen(articles), updates=frozen(updates))
+
+def sync_shared_state():
+    '''
+    Shows the dashboard data published by the fetcher process, if it has changed since the last read.
+    '''
+    global shared_version
+    with shared_lock:
+        published = shared_state.read(shared_version)
+        if published is None:
+            return
+        shared_version, values = published
+        state.update(from_shared_values, values)
+
+def follow_shared_state(interval: float = 1):
+    '''
+    Checks for data published by the fetcher process, so that changes are pushed to the open pages.
+
+    Parameters:
+        - interval (float): Defaultly set to 1; the number of seconds between checks.
+    '''
+    while True:
+        try:
+            sync_shared_state()
+        except Exception:
+            logging.exception('Shared state: published data could not be read.')
+        sleep(interval)
+
+def with_covid_updates(current, updates: dict):
+    '''
+    Builds a snapshot showing new covid updates.
+    Areas which have not been fetched yet are shown as loading.
+
+    Parameters:
+        - current (DashboardState): The dashboard snapshot.
+        - updates (dictionary): The covid updates of each location.
+
+    Returns the new snapshot.
+    '''
+    local_updates = updates.get(covid_location)
+    nation_updates = updates.get(nation_location)
+    if nation_updates:
+        national = {'national_infections': nation_updates['last7'],
+                    'hospital_cases': str(nation_updates['hospital_current']) + ' hospital cases',
+                    'deaths': str(nation_updates['deaths']) + ' total deaths'}
+    else:
+        national = {'national_infections': 'Loading...',
+                    'hospital_cases': 'Loading hospital cases...',
+                    'deaths': 'Loading total deaths...'}
+    return current._replace(area_updates=frozen(updates),
+                            local_infections=local_updates['last7'] if local_updates else 'Loading...',
+                            **national)
+
+def show_covid_updates(updates: dict):
+    '''
+    Updates the values shown on the dashboard.
+
+    Parameters:
+        - updates (dictionary): The covid updates of each location.
     '''
-    updates = covid_API_request(nation_location, nation_location_type)
-    covid_cases = updates['last7']
-    hospital_covid_cases = updates['hospital_current']
-    covid_deaths = updates['deaths']
-    logging.info('National infection rates, hospital cases and deaths fetched.')
-    return covid_cases, hospital_covid_cases, covid_deaths
+    state.update(with_covid_updates, updates)
+
+def refresh_covid():
+    '''
+    Fetches the covid data of every area and updates the values shown on the dashboard.
+    '''
+    show_covid_updates(get_infections())
+
+def load_covid_snapshots():
+    '''
+    Shows the covid data saved by the last fetch of each area, without using the covid API.
+    '''
+    updates = {}
+    for location, location_type in covid_areas:
+        snapshot = load_covid_snapshot(location, location_type)
+        if snapshot is not None:
+            updates[location] = snapshot
+    show_covid_updates(updates)
+    logging.info('Infection rates loaded from %s snapshots.', len(updates))
+
+def area_view(current, area: str):
+    '''
+    Gets the area to show in the local infection rate from the cached covid updates,
+    without using the covid API.
+
+    Parameters:
+        - current (DashboardState): The dashboard snapshot.
+        - area (string): The area chosen by the user, or None for the local area from the config file.
+
+    Returns the area's name and its 7 day infection rate.
+    '''
+    if area is None or area == covid_location or area not in current.area_updates:
+        return covid_location, current.local_infections
+    return area, current.area_updates[area]['last7']
+
+def index_articles(articles: list, deleted_titles: frozenset = None) -> dict:
+    '''
+    Keys the articles by title, leaving out repeated and dismissed articles.
+
+    Parameters:
+        - articles (list): The articles, as returned by get_news.
+        - deleted_titles (frozenset): Defaultly set to None; the titles of dismissed articles.
+          If None, the titles dismissed in the current snapshot are used.
+
+    Returns a dictionary of the articles in their original order.
+    '''
+    if deleted_titles is None:
+        deleted_titles = state.get().deleted_titles
+    articles_by_title = {}
+    for article in articles:
+        if article['title'] not in deleted_titles:
+            articles_by_title.setdefault(article['title'], article)
+    return articles_by_title
+
+def with_articles(current, articles: list):
+    '''
+    Builds a snapshot showing new articles, leaving out repeated and dismissed articles.
+
+    Parameters:
+        - current (DashboardState): The dashboard snapshot.
+        - articles (list): The articles, as returned by get_news.
+
+    Returns the new snapshot.
+    '''
+    return current._replace(articles=frozen(index_articles(articles, current.deleted_titles)))
 
 def get_news():
     '''
@@ -65,8 +288,34 @@ def get_news():
     Returns a list of dictionaries of articles.
     '''
     update_news()
+    return load_news()
+
+def format_article(title: str, content: str, url: str) -> dict:
+    '''
+    Formats an article for the news column, with a link to the full article.
+
+    Parameters:
+        - title (string): The title of the article.
+        - content (string): The start of the article.
+        - url (string): The link to the full article.
+    '''
+    return {'title': title, 'content': content + " " + Markup('<a href={}>Read more</a>'.format(str(url)))}
+
+def load_news():
+    '''
+    Gets the news in the article store, without using the news API.
+    Before the first fetch, the news saved to 'covid_articles.csv' by older versions is used.
+
+    Returns a list of dictionaries of articles.
+    '''
+    stored_articles = get_article_store().articles()
+    if stored_articles:
+        return [format_article(article['title'], article.get('content') or '', article['url'])
+                for article in stored_articles]
     words = {}
     articles_list = []
+    if not os.path.exists('covid_articles.csv'):
+        return articles_list
     with open('covid_articles.csv', 'r', encoding="utf8") as infile:
         reader = csv.reader(infile)
         for rows in reader:
@@ -75,11 +324,28 @@ def get_news():
                 news_hyperlink = columns[3]
                 news_hyperlink = news_hyperlink
                 news_contents = columns[6]
-                words = {'title':news_titles, 'content':news_contents + " " + Markup('<a href={}>Read more</a>'.format(str(news_hyperlink)))}
+                words = format_article(news_titles, news_contents, news_hyperlink)
                 articles_list.append(words)
-                logging.info('News fetched from News API.')
     return articles_list
 
+def seconds_until(hour_input: int, minute_input: int, now: datetime = None) -> int:
+    '''
+    Works out how long it is until the next time the clock shows a time of day.
+
+    Parameters:
+        - hour_input (int): The hour.
+        - minute_input (int): The minute.
+        - now (datetime): Defaultly set to None; the time to count from. If None, the current time is used.
+
+    Returns the number of seconds, plus one so the update runs just after the minute starts.
+    '''
+    if now is None:
+        now = datetime.today()
+    timing = now.replace(hour = hour_input, minute = minute_input, second = 0, microsecond = 0)
+    if timing <= now:
+        timing = timing + timedelta(days=1)
+    return int((timing - now).total_seconds()) + 1
+
 def schedule_update(update_name: str, hour_input: int, minute_input: int, repeat: str, covid: str, news: str, update_time: str) -> list:
     '''
     Schedules updates for either the news or covid,
@@ -96,93 +362,44 @@ def schedule_update(update_name: str, hour_input: int, minute_input: int, repeat
         
     Returns a list to be appended to the widgets list, so that the widgets can be updated.
     '''
-    global list_of_updates
-    global threads
-    global update_tracking
-    today = datetime.today()
-    time = str(today.time())
-    hour_now = int(time[0]+time[1])
-    minute_now = int(time[3]+time[4])
+    def finish_update(fetch):
+        '''
+        Schedules the fetch again for the same time tomorrow if there is a repeat.
+        The time is worked out again each day, so the time taken by the fetch does not add up.
+        Otherwise, removes the widget once the update has nothing left to run.
+
+        Parameters:
+            - fetch: The fetch function which has just run.
+        '''
+        if repeat == "repeat":
+            scheduler.enter(seconds_until(hour_input, minute_input), update_name, fetch)
+            logging.info('%s: Repeat scheduled.', update_name, extra={'update': update_name})
+        elif update_name not in scheduler and state.update(without_update, update_name) is not None:
+            logging.info('%s: Widget removed.', update_name, extra={'update': update_name})
     def fetch_news():
         '''
         Fetches the news and checks to make sure there are no repeat articles.
         Begins the timing for the scheduling if there is a repeat.
         '''
-        global list_of_articles
-        list_of_articles = get_news()
-        for i in range(len(list_of_articles)):
-            if list_of_articles[i] in deleted_articles:
-                del list_of_articles[i]
-                logging.info('News fetched from News API.')
-        if repeat == "repeat":
-            t1 = Timer(60*60*24, schedule_update, args=(update_name, hour_input, minute_input,
-                                                        repeat, covid, news, update_time))
-            threads.append(t1)
-            update_tracking.append(update_name)
-            t1.start()
-            logging.info(update_name + ': Repeat scheduled.')
-        else:
-            for i in range(len(list_of_updates)):
-                try:
-                    if list_of_updates[i]['title'] == update_name:
-                        cancel_update(update_name)
-                        del list_of_updates[i]
-                        logging.info(update_name + ': Widget removed.')
-                except IndexError:
-                    logging.error(update_name + ': IndexError.')
-                    break
+        state.update(with_articles, coalescer.run('news', get_news))
+        logging.info('News fetched from News API.', extra={'update': update_name})
+        finish_update(fetch_news)
     def fetch_covid():
         '''
         Fetches the covid data.
         Begins the timing for the scheduling if there is a repeat.
         '''
-        global list_of_updates
-        global local_infections, national_infections
-        global hospital_cases, deaths
-        local_infections = get_local_infections()
-        national_infections, hospital_cases, deaths = get_national_infections()
-        hospital_cases = str(hospital_cases) + ' hospital cases'
-        deaths = str(deaths) + ' total deaths'
-        logging.info('Infection rates fetched from Covid API.')
-        if repeat == "repeat":
-            t1 = Timer(60*60*24, schedule_update, args=(update_name, hour_input, minute_input,
-                                                        repeat, covid, news, update_time))
-            threads.append(t1)
-            update_tracking.append(update_name)
-            t1.start()
-            logging.info(update_name + ': Repeat scheduled.')
-        else:
-            for i in range(len(list_of_updates)):
-                try:
-                    if list_of_updates[i]['title'] == update_name:
-                        cancel_update(update_name)
-                        del list_of_updates[i]
-                        logging.info(update_name + ': Widget removed.')
-                except IndexError:
-                    logging.error(update_name + ': IndexError.')
-                    break
+        coalescer.run('covid', refresh_covid)
+        logging.info('Infection rates fetched from Covid API.', extra={'update': update_name})
+        finish_update(fetch_covid)
     temp_string = 'Next update at: ' + update_time
-    if  (hour_now > hour_input) or ((hour_now == hour_input) and (minute_now >= minute_input)):
-        timing = today.replace(day = today.day+1, hour = hour_input,
-                               minute = minute_input, second = 0,
-                               microsecond = 0) + timedelta(days=1)
-    else:
-        timing = today.replace(hour = hour_input, minute = minute_input,
-                               second = 0, microsecond = 0)
-    delta_t = timing-today
-    secs = delta_t.seconds+1
+    secs = seconds_until(hour_input, minute_input)
     if news == "news":
-        t = Timer(secs, fetch_news)
+        scheduler.enter(secs, update_name, fetch_news)
         temp_string = temp_string + '; updating news'
-        threads.append(t)
-        update_tracking.append(update_name)
-        t.start()
     if covid == "covid-data":
-        t = Timer(secs, fetch_covid)
+        scheduler.enter(secs, update_name, fetch_covid)
         temp_string = temp_string + '; updating covid data'
-        threads.append(t)
-        update_tracking.append(update_name)
-        t.start()
     if repeat == "repeat":
         temp_string = temp_string + '; repeating daily'
     temp_dict = {'title': update_name, 'content': temp_string}
@@ -190,44 +407,295 @@ def schedule_update(update_name: str, hour_input: int, minute_input: int, repeat
     temp_list.append(temp_dict)
     return temp_list
 
+def with_update(current, widget: dict):
+    '''
+    Builds a snapshot showing an update widget.
+
+    Parameters:
+        - current (DashboardState): The dashboard snapshot.
+        - widget (dictionary): The widget, as returned by schedule_update.
+
+    Returns the new snapshot.
+    '''
+    return current._replace(updates=frozen({**current.updates, widget['title']: widget}))
+
+def without_update(current, title: str):
+    '''
+    Builds a snapshot without an update widget.
+
+    Parameters:
+        - current (DashboardState): The dashboard snapshot.
+        - title (string): The title of the update.
+
+    Returns the new snapshot, or the same snapshot if there is no such widget.
+    '''
+    if title not in current.updates:
+        return current
+    return current._replace(updates=frozen({key: widget for key, widget in current.updates.items() if key != title}))
+
+def without_article(current, title: str):
+    '''
+    Builds a snapshot without an article, which is then not shown again.
+
+    Parameters:
+        - current (DashboardState): The dashboard snapshot.
+        - title (string): The title of the article.
+
+    Returns the new snapshot, or the same snapshot if there is no such article.
+    '''
+    if title not in current.articles:
+        return current
+    return current._replace(articles=frozen({key: article for key, article in current.articles.items() if key != title}),
+                            deleted_titles=current.deleted_titles | {title})
+
+def add_update(update_name: str, hour_input: int, minute_input: int, repeat: str, covid: str, news: str, update_time: str):
+    '''
+    Schedules an update and shows its widget. The parameters are those of schedule_update.
+    '''
+    for widget in schedule_update(update_name, hour_input, minute_input, repeat, covid, news, update_time):
+        state.update(with_update, widget)
+
+def remove_update(title: str):
+    '''
+    Removes an update widget and cancels its scheduled updates.
+
+    Parameters:
+        - title (string): The title of the update.
+    '''
+    if state.update(without_update, title) is not None:
+        cancel_update(title)
+        logging.info('%s: Widget removed.', title, extra={'update': title})
+
+def dismiss_article(title: str):
+    '''
+    Removes an article from the news column, so that it is not shown again.
+
+    Parameters:
+        - title (string): The title of the article.
+    '''
+    state.update(without_article, title)
+
+#The changes users can make, by name, so that web workers can send them to the fetcher process.
+ACTIONS = {'add_update': add_update, 'remove_update': remove_update, 'dismiss_article': dismiss_article}
+
+def perform(action: str, *arguments):
+    '''
+    Makes a change to the dashboard in this process or, in a web worker, sends it to the fetcher process.
+
+    Parameters:
+        - action (string): The name of the change in ACTIONS.
+        - arguments: The arguments of the change.
+    '''
+    if shared_state is None or is_fetcher:
+        ACTIONS[action](*arguments)
+    else:
+        shared_state.send(action, *arguments)
+
 def cancel_update(update_name: str):
     '''
     Cancels scheduled updates.
     
     Parameters:
-        - update_name (string): The name of the update the user has entered in the update label. Used to keep track of threads to cancel.
-    '''
-    global update_tracking
-    global threads
-    for i in range(len(update_tracking)):
-        if update_tracking[i] == update_name:
-            threads[i].cancel()
-            logging.info(update_name + ': Update cancelled.')
-        try:
-            assert len(update_tracking) == len(threads)
-        except AssertionError:
-            logging.error(update_name + ": Assertion Error.")
-            pass
+        - update_name (string): The name of the update the user has entered in the update label. Used to find the updates to cancel.
+    '''
+    if scheduler.cancel(update_name):
+        logging.info('%s: Update cancelled.', update_name, extra={'update': update_name})
+
+def warm_up():
+    '''
+    Fetches fresh covid data and news in the background once the server has started.
+    Until then, the dashboard shows the last snapshot.
+    '''
+    try:
+        coalescer.run('covid', refresh_covid)
+    except Exception:
+        logging.exception('Warm-up: infection rates could not be fetched.')
+    try:
+        state.update(with_articles, coalescer.run('news', get_news))
+    except Exception:
+        logging.exception('Warm-up: news could not be fetched.')
+    logging.info('Warm-up finished.')
+
+@app.before_request
+def start_timing():
+    '''
+    Notes when a request started, for the request histogram.
+    '''
+    g.request_started = perf_counter()
+
+@app.after_request
+def record_request(response):
+    '''
+    Counts a request and adds the time it took to the request histogram.
+
+    Parameters:
+        - response: The response to the request.
+    '''
+    endpoint = request.endpoint or 'unknown'
+    if 'request_started' in g:
+        request_seconds.observe(perf_counter() - g.request_started, endpoint=endpoint)
+    requests_answered.inc(endpoint=endpoint, status=str(response.status_code))
+    return response
+
+@app.after_request
+def report_startup(response):
+    '''
+    Logs how long the server took from being imported to serving its first request.
+
+    Parameters:
+        - response: The response to the request.
+    '''
+    global startup_time
+    if startup_time is None:
+        startup_time = perf_counter() - import_started
+        logging.info('Startup: first request served %.3f seconds after import.', startup_time)
+    return response
+
+@app.before_request
+def read_shared_state():
+    '''
+    In a web worker, shows the latest data published by the fetcher process before each request,
+    and starts following it once the first request arrives.
+    '''
+    global shared_follower
+    if shared_state is None or is_fetcher:
+        return
+    sync_shared_state()
+    if shared_follower is None:
+        shared_follower = Thread(target=follow_shared_state, daemon=True)
+        shared_follower.start()
+
+def start_dashboard():
+    '''
+    Shows the last snapshots of the covid data and news, then fetches fresh data in the background.
+    '''
+    load_covid_snapshots()
+    state.update(with_articles, load_news())
+    Thread(target=warm_up, daemon=True).start()
+
+def run_fetcher(poll_interval: float = 0.25):
+    '''
+    Runs this process as the fetcher for the web workers: it fetches the data, runs the scheduled updates,
+    makes the changes sent by the web workers and publishes the dashboard data to the shared state file.
+
+    Parameters:
+        - poll_interval (float): Defaultly set to 0.25; the number of seconds between checks for changes sent by the web workers.
+    '''
+    global is_fetcher
+    is_fetcher = True
+    start_dashboard()
+    logging.info('Fetcher: started.')
+    while True:
+        for action, arguments in shared_state.receive():
+            try:
+                ACTIONS[action](*arguments)
+            except Exception:
+                logging.exception('Fetcher: %s failed.', action)
+        sleep(poll_interval)
+
+#Without a shared state file, this process fetches the data itself.
+#Otherwise it is a web worker, and fetcher.py runs the fetcher process.
+if shared_state is None:
+    start_dashboard()
 
-local_infections = get_local_infections()
-national_infections, hospital_cases, deaths = get_national_infections()
-hospital_cases = str(hospital_cases) + ' hospital cases'
-deaths = str(deaths) + ' total deaths'
-list_of_articles = get_news()
+def render_dashboard(page_title: str, area: str):
+    '''
+    Renders the dashboard, reusing the page rendered before unless the data has changed.
+
+    Parameters:
+        - page_title (string): The title shown at the top of the page.
+        - area (string): The area chosen by the user, or None for the local area from the config file.
+
+    Returns the page and its ETag.
+    '''
+    #The whole page is rendered from one snapshot, even if the data changes meanwhile.
+    current = state.get()
+    location, infections = area_view(current, area)
+    key = (current.version, page_title, location)
+    page = rendered_pages.get(key)
+    if page is None:
+        with span('render_template'):
+            html = render_template('index.html', image = "zhongli.jpg", title=page_title, location = location,
+                                   areas = [area for area, area_type in covid_areas],
+                                   local_7day_infections = infections,
+                                   national_7day_infections = current.national_infections,
+                                   nation_location = nation_location, hospital_cases = current.hospital_cases,
+                                   deaths_total = current.deaths, news_articles = list(current.articles.values()),
+                                   updates = list(current.updates.values()))
+        page = (html, hashlib.sha1(html.encode("utf8")).hexdigest())
+        #Pages rendered for older data are never used again, so they are dropped.
+        for old_key in [old_key for old_key in list(rendered_pages) if old_key[0] < current.version]:
+            rendered_pages.pop(old_key, None)
+        rendered_pages[key] = page
+    return page
+
+def dashboard_response(page_title: str, area: str):
+    '''
+    Responds with the dashboard, or with '304 Not Modified' if the browser already has this page.
+
+    Parameters:
+        - page_title (string): The title shown at the top of the page.
+        - area (string): The area chosen by the user, or None for the local area from the config file.
+    '''
+    html, etag = render_dashboard(page_title, area)
+    response = make_response(html)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/')
 def index():
     '''
     What is first observed when the site is brought up.
     '''
-    with app.app_context():
-        return render_template('index.html', image = "zhongli.jpg", title="COVID API", location = covid_location,
-                               local_7day_infections = local_infections,
-                               national_7day_infections = national_infections,
-                               nation_location = nation_location, hospital_cases = hospital_cases,
-                               deaths_total = deaths, news_articles = list_of_articles,
-                               updates = list_of_updates)
-        
+    return dashboard_response("COVID API", request.values.get("area"))
+
+
+@app.route('/events')
+def events():
+    '''
+    Streams the dashboard values to an open page as Server-Sent Events whenever they change.
+    '''
+    return Response(live.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def metrics():
+    '''
+    Shows the counters and timing histograms in the Prometheus text format.
+    '''
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/analytics')
+def analytics():
+    '''
+    Serves the derived covid series of a configured area as JSON, newest dates first (see covid_analytics.py).
+    The query parameters are:
+        - area: Defaultly the local area from the config file; any area in the config file.
+        - start and end: Optional; the first and last dates to include, as 'YYYY-MM-DD'.
+        - page and page_size: Defaultly 1 and 100; page_size can be at most 1000.
+    '''
+    area = request.args.get('area', covid_location)
+    if area not in [location for location, location_type in covid_areas]:
+        return jsonify({'error': 'Unknown area: ' + area}), 404
+    try:
+        page = int(request.args.get('page', 1))
+        page_size = int(request.args.get('page_size', 100))
+        start = request.args.get('start')
+        end = request.args.get('end')
+        for day in (start, end):
+            if day is not None:
+                datetime.strptime(day, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'page and page_size must be numbers, and start and end dates as YYYY-MM-DD.'}), 400
+    if page < 1 or not 1 <= page_size <= 1000:
+        return jsonify({'error': 'page must be at least 1, and page_size between 1 and 1000.'}), 400
+    series, version = area_analytics(area, populations.get(area))
+    response = jsonify({'area': area, 'population': populations.get(area), 'version': version,
+                        'start': start, 'end': end, **analytics_page(series, start, end, page, page_size)})
+    response.set_etag(hashlib.sha1((str(version) + request.query_string.decode()).encode("utf8")).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/index', methods=['GET'])
 def get_update():
@@ -244,18 +712,15 @@ def get_update():
         covid = request.values.get("covid-data")
         news = request.values.get("news")
         full_url = str(request.url)
-        global list_of_updates
-        for i in range(len(list_of_updates)):
-            if list_of_updates[i]['title'] == update_name:
-                page_title = "MESSAGE: Sorry, that update title is already in use."
-                repeated = True
+        current = state.get()
+        if update_name in current.updates:
+            page_title = "MESSAGE: Sorry, that update title is already in use."
+            repeated = True
         if repeated is False:
             if ((update_name is not None) and (update_time != '') and ((covid is not None) or (news is not None))):
                 hour_input = int(update_time[0]+update_time[1])
                 minute_input = int(update_time[3]+update_time[4])
-                temp_list = schedule_update(update_name, hour_input, minute_input,
-                                                repeat, covid, news, update_time)
-                list_of_updates = list_of_updates + temp_list
+                perform('add_update', update_name, hour_input, minute_input, repeat, covid, news, update_time)
                 page_title = "COVID API"
             elif ((update_time == '') or ((covid is None) or (news is None))):
                 if "index?update" in full_url:
@@ -270,18 +735,10 @@ def get_update():
             title = title.replace("%21", "!")
             if "&" in title:
                 title = title.split("&", 1)[0]
-            for i in range(len(list_of_updates)):
-                try:
-                    if list_of_updates[i]['title'] == title:
-                        cancel_update(title)
-                        del list_of_updates[i]
-                        logging.info(title + ': Widget removed.')
-                        page_title = "COVID API"
-                except IndexError:
-                    logging.error("Index error.")
-                    break
+            if title in current.updates:
+                perform('remove_update', title)
+                page_title = "COVID API"
         if "notif=" in full_url:
-            global list_of_articles
             # Replaces all the values in the URL to match the title.
             news_title = full_url.split("notif=", 1)[1]
             news_title = news_title.replace("+", " ")
@@ -296,21 +753,10 @@ def get_update():
             news_title = news_title.replace("%3B", ";")
             news_title = news_title.replace("%3F", "?")
             news_title = news_title.replace("%24", "$")
-            for i in range(len(list_of_articles)):
-                try:
-                    if list_of_articles[i]['title'] == news_title:
-                        deleted_articles.append(list_of_articles[i])
-                        del list_of_articles[i]
-                        page_title = "COVID API"
-                except IndexError:
-                    logging.error("Index error.")
-                    break
-        return render_template('index.html', image = "zhongli.jpg", title=page_title, location = covid_location,
-                               local_7day_infections = local_infections,
-                               national_7day_infections = national_infections,
-                               nation_location = nation_location, hospital_cases = hospital_cases,
-                               deaths_total = deaths, news_articles = list_of_articles,
-                               updates = list_of_updates)
+            if news_title in current.articles:
+                perform('dismiss_article', news_title)
+                page_title = "COVID API"
+        return dashboard_response(page_title, request.values.get("area"))
     else:
         pass
 
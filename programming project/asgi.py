@@ -0,0 +1,141 @@
+'''
+Module name: asgi.py
+
+Description:
+    - Serves the dashboard from an asyncio event loop, for example:
+        uvicorn asgi:application
+    - The dashboard pages ('/' and '/index' without a form) are rendered from the current snapshot in memory,
+      and '/events' streams from the event loop, so thousands of open pages need no thread each.
+    - Every other request (forms on '/index', '/analytics', '/metrics') is passed to the Flask app,
+      which answers it in a worker thread, so the event loop is never blocked.
+    - The covid and news fetches still run in the background threads of app.py, so no request waits for an API.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import asyncio
+from time import perf_counter
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+import app as dashboard
+
+flask_application = WsgiToAsgi(dashboard.app)
+#The query parameters which only choose what the dashboard page shows.
+PAGE_PARAMETERS = {'area'}
+
+def _header(scope: dict, name: bytes) -> str:
+    '''
+    Gets a request header, or '' if it was not sent.
+
+    Parameters:
+        - scope (dictionary): The ASGI connection scope.
+        - name (bytes): The header name, in lower case.
+    '''
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+def _is_page_request(scope: dict, query: dict) -> bool:
+    '''
+    Checks whether a request is for the dashboard page alone, without a form to handle.
+
+    Parameters:
+        - scope (dictionary): The ASGI connection scope.
+        - query (dictionary): The query parameters.
+    '''
+    return scope['method'] in ('GET', 'HEAD') and scope['path'] in ('/', '/index') and set(query) <= PAGE_PARAMETERS
+
+async def _lifespan(receive, send):
+    '''
+    Answers the server's startup and shutdown messages. The dashboard is started when app.py is imported.
+
+    Parameters:
+        - receive: The ASGI receive function.
+        - send: The ASGI send function.
+    '''
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def _page(scope: dict, query: dict, send):
+    '''
+    Responds with the dashboard, or with '304 Not Modified' if the browser already has this page.
+
+    Parameters:
+        - scope (dictionary): The ASGI connection scope.
+        - query (dictionary): The query parameters.
+        - send: The ASGI send function.
+    '''
+    started = perf_counter()
+    if dashboard.shared_state is not None:
+        #Reading the shared state file is done in a worker thread.
+        await asyncio.to_thread(dashboard.read_shared_state)
+    with dashboard.app.app_context():
+        html, etag = dashboard.render_dashboard("COVID API", query.get('area', [None])[0])
+    headers = [(b'etag', ('"' + etag + '"').encode()), (b'cache-control', b'no-cache')]
+    if '"' + etag + '"' in _header(scope, b'if-none-match'):
+        status, body = 304, b''
+    else:
+        status, body = 200, html.encode('utf8')
+        headers += [(b'content-type', b'text/html; charset=utf-8'), (b'content-length', str(len(body)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+    endpoint = 'index' if scope['path'] == '/' else 'get_update'
+    dashboard.request_seconds.observe(perf_counter() - started, endpoint=endpoint)
+    dashboard.requests_answered.inc(endpoint=endpoint, status=str(status))
+
+async def _events(receive, send):
+    '''
+    Streams the dashboard values to an open page as Server-Sent Events until the page is closed.
+
+    Parameters:
+        - receive: The ASGI receive function.
+        - send: The ASGI send function.
+    '''
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                            (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+    async def forward():
+        async for message in dashboard.live.stream_async():
+            await send({'type': 'http.response.body', 'body': message.encode('utf8'), 'more_body': True})
+    async def closed():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+    forwarding = asyncio.ensure_future(forward())
+    tasks = [forwarding, asyncio.ensure_future(closed())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    if forwarding.done() and not forwarding.cancelled() and forwarding.exception() is None:
+        #The stream ended while the page was still open (it was dropped for reading too slowly), so the response is ended.
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    dashboard.requests_answered.inc(endpoint='events', status='200')
+
+async def application(scope, receive, send):
+    '''
+    The ASGI application serving the dashboard.
+
+    Parameters:
+        - scope (dictionary): The ASGI connection scope.
+        - receive: The ASGI receive function.
+        - send: The ASGI send function.
+    '''
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if scope['type'] == 'http' and _is_page_request(scope, query):
+        await _page(scope, query, send)
+    elif scope['type'] == 'http' and scope['path'] == '/events' and scope['method'] == 'GET':
+        await _events(receive, send)
+    else:
+        await flask_application(scope, receive, send)
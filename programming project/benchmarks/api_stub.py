@@ -0,0 +1,101 @@
+'''
+Module name: api_stub.py
+
+Description:
+    - Local stand-ins for the covid API and the News API, used by the benchmark suite so that no real API is called.
+    - The responses are built from the recorded fixtures 'covid_updates.json' and 'covid_articles.json',
+      repeated 'scale' times (each copy of the covid data is a separate area, and each copy of the news is a separate page).
+
+Author: Destyny Ho
+'''
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import parse_qs, urlparse
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COVID_PAGE_SIZE = 1000
+
+def covid_fixture(scale: int = 1) -> list:
+    '''
+    Builds the covid API rows from 'covid_updates.json'. The first copy is England; the others are synthetic areas.
+
+    Parameters:
+        - scale (int): Defaultly set to 1; the number of areas.
+    '''
+    with open(os.path.join(PROJECT_DIR, 'covid_updates.json'), encoding="utf8") as json_file:
+        rows = json.load(json_file)['data']
+    data = list(rows)
+    for copy in range(1, scale):
+        data.extend(dict(row, areaCode=row['areaCode'] + '-' + str(copy), areaName='Area ' + str(copy))
+                    for row in rows)
+    return data
+
+def news_fixture(page: int = 1) -> dict:
+    '''
+    Builds a News API page from 'covid_articles.json'. The articles are given different URLs on every page.
+
+    Parameters:
+        - page (int): Defaultly set to 1; the page of results.
+    '''
+    with open(os.path.join(PROJECT_DIR, 'covid_articles.json'), encoding="utf8") as json_file:
+        response = json.load(json_file)
+    for article in response['articles']:
+        article['url'] = article['url'] + '#page' + str(page)
+    return response
+
+class StubHandler(BaseHTTPRequestHandler):
+    '''
+    Answers '/v1/data' like the covid API and '/v2/everything' like the News API.
+    '''
+    protocol_version = 'HTTP/1.1'
+    covid_rows = []
+    news_pages = {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        page = int(parse_qs(url.query).get('page', ['1'])[0])
+        if url.path == '/v1/data':
+            rows = StubHandler.covid_rows[(page - 1) * COVID_PAGE_SIZE:page * COVID_PAGE_SIZE]
+            more = page * COVID_PAGE_SIZE < len(StubHandler.covid_rows)
+            body = {'data': rows, 'length': len(rows),
+                    'pagination': {'next': '/v1/data?page=' + str(page + 1) if more else None}}
+        elif url.path == '/v2/everything':
+            if page not in StubHandler.news_pages:
+                StubHandler.news_pages[page] = news_fixture(page)
+            body = StubHandler.news_pages[page]
+        else:
+            self.send_error(404)
+            return
+        encoded = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            #The client (such as a benchmark process) exited with the connection still open.
+            pass
+
+    def log_message(self, *args):
+        pass
+
+def serve(scale: int = 1) -> str:
+    '''
+    Serves both stubs on a free local port in a background thread.
+
+    Parameters:
+        - scale (int): Defaultly set to 1; how many times the covid fixture is repeated.
+
+    Returns the base URL of the server.
+    '''
+    StubHandler.covid_rows = covid_fixture(scale)
+    StubHandler.news_pages = {}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return 'http://127.0.0.1:' + str(server.server_port)
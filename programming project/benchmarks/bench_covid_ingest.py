@@ -0,0 +1,72 @@
+'''
+Module name: bench_covid_ingest.py
+
+Description:
+    - Benchmark comparing the two ways of turning a covid API response into the dashboard values:
+        - the disk round trip (json dump, json_normalize, csv write, parse_csv_data, process_covid_csv_data).
+        - the in-memory path (process_covid_json_data).
+    - The response is built from 'nation_2021-10-28.csv', scaled up 100 times.
+
+Usage (from the 'programming project' directory):
+    python benchmarks/bench_covid_ingest.py [scale] [repeats]
+
+Author: Destyny Ho
+'''
+import os
+import sys
+import tempfile
+import timeit
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from covid_data_handler import (parse_csv_data, process_covid_csv_data,
+                                process_covid_json_data, write_covid_snapshot)
+from covid_store import METRICS
+
+def load_fixture(scale: int = 100) -> dict:
+    '''
+    Builds a covid API shaped response from the nation fixture.
+
+    Parameters:
+        - scale (int): Defaultly set to 100; how many times the 639 rows are repeated.
+
+    Returns the response as a dictionary.
+    '''
+    rows = parse_csv_data(os.path.join(PROJECT_DIR, 'nation_2021-10-28.csv'))[:-1]
+    data = [{key: (int(value) if value != '' else None) if key in METRICS else value
+             for key, value in row.items()} for row in rows]
+    return {'data': data * scale}
+
+def round_trip(data: dict, directory: str):
+    '''
+    Computes the dashboard values by writing the response to disk and parsing it back.
+
+    Parameters:
+        - data (dictionary): The covid API shaped response.
+        - directory (string): The directory the snapshot files are written to.
+    '''
+    csv_filename = os.path.join(directory, 'covid_updates.csv')
+    write_covid_snapshot(data, os.path.join(directory, 'covid_updates.json'), csv_filename)
+    return process_covid_csv_data(parse_csv_data(csv_filename))
+
+def main(scale: int = 100, repeats: int = 5):
+    '''
+    Runs both paths and prints the best time of each.
+
+    Parameters:
+        - scale (int): Defaultly set to 100; how many times the fixture is repeated.
+        - repeats (int): Defaultly set to 5; how many times each path is timed.
+    '''
+    data = load_fixture(scale)
+    with tempfile.TemporaryDirectory() as directory:
+        assert round_trip(data, directory) == process_covid_json_data(data)
+        disk = min(timeit.repeat(lambda: round_trip(data, directory), number=1, repeat=repeats))
+    memory = min(timeit.repeat(lambda: process_covid_json_data(data), number=1, repeat=repeats))
+    print('rows:', len(data['data']))
+    print('disk round trip: {:.3f} ms'.format(disk * 1000))
+    print('in memory:       {:.3f} ms'.format(memory * 1000))
+    print('speed-up:        {:.0f}x'.format(disk / memory))
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
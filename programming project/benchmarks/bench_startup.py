@@ -0,0 +1,80 @@
+'''
+Module name: bench_startup.py
+
+Description:
+    - Benchmark measuring how long the app takes from being imported to serving its first request.
+    - Each run is a fresh Python process, so nothing is cached between runs.
+    - The app runs in a temporary directory with the APIs replaced by the stubs in api_stub.py,
+      so no real API is called and no project file is changed. One untimed run first fills in the snapshots,
+      so the timed runs start from saved data, as the app normally does.
+
+Usage (from the 'programming project' directory):
+    python benchmarks/bench_startup.py [runs]
+
+Author: Destyny Ho
+'''
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import api_stub
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#Run in the temporary directory with the project directory and the stub URL as arguments.
+#After timing, it waits for the warm-up, so that the snapshots are written before the process exits.
+MEASURE = """
+import sys
+import time
+from time import perf_counter
+sys.path.insert(0, sys.argv[1])
+import covid_data_handler
+import covid_news_handling
+covid_data_handler.COVID_API_URL = sys.argv[2] + '/v1/data'
+covid_news_handling.NEWS_API_URL = sys.argv[2] + '/v2/everything'
+covid_news_handling.news_api_key = 'benchmark'
+started = perf_counter()
+import app
+imported = perf_counter()
+app.app.test_client().get('/')
+served = perf_counter()
+print(imported - started, served - started)
+deadline = time.monotonic() + 30
+while not app.state.get().articles and time.monotonic() < deadline:
+    time.sleep(0.05)
+"""
+
+def measure_startup(directory: str, stub_url: str) -> tuple:
+    '''
+    Starts the app in a new process and times it.
+
+    Parameters:
+        - directory (string): The temporary directory the app runs in.
+        - stub_url (string): The base URL of the API stubs.
+
+    Returns the seconds taken to import the app and to serve the first request.
+    '''
+    output = subprocess.run([sys.executable, '-c', MEASURE, PROJECT_DIR, stub_url], cwd=directory,
+                            capture_output=True, text=True, check=True).stdout
+    imported, served = output.split()[-2:]
+    return float(imported), float(served)
+
+def main(runs: int = 5):
+    '''
+    Runs the app several times and prints the best times.
+
+    Parameters:
+        - runs (int): Defaultly set to 5; how many processes are started.
+    '''
+    stub_url = api_stub.serve()
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copy(os.path.join(PROJECT_DIR, 'config.json'), directory)
+        measure_startup(directory, stub_url)
+        times = [measure_startup(directory, stub_url) for run in range(runs)]
+    print('import:        {:.3f} s'.format(min(imported for imported, served in times)))
+    print('first request: {:.3f} s'.format(min(served for imported, served in times)))
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,119 @@
+'''
+Module name: load_test_live_updates.py
+
+Description:
+    - Load test comparing the two ways an open dashboard keeps up to date:
+        - polling: every viewer reloads '/index' (the old 60 second meta refresh).
+        - pushing: every viewer holds one '/events' stream and receives only the changed values.
+    - The app is served on a local port from a temporary directory, with the APIs replaced by the stubs in api_stub.py,
+      so no external API is called and no project file is changed. Its warm-up finishes before anything is measured.
+
+Usage (from the 'programming project' directory):
+    python benchmarks/load_test_live_updates.py [viewers] [changes]
+
+Author: Destyny Ho
+'''
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+import requests
+from werkzeug.serving import make_server
+import api_stub
+from run_benchmarks import PROJECT_DIR, start_app
+
+POLLS_PER_HOUR = 60
+
+def serve(app) -> str:
+    '''
+    Serves the app on a free local port in a background thread.
+
+    Parameters:
+        - app: The app module, as given by start_app.
+
+    Returns the base URL of the server.
+    '''
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return 'http://127.0.0.1:' + str(server.server_port)
+
+def poll(base_url: str, viewers: int) -> tuple:
+    '''
+    Reloads the page once for every viewer, as the meta refresh does.
+
+    Parameters:
+        - base_url (string): The base URL of the server.
+        - viewers (int): The number of viewers.
+
+    Returns the bytes received and the seconds taken.
+    '''
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(viewers, 32)) as executor:
+        sizes = list(executor.map(lambda viewer: len(requests.get(base_url + '/index').content), range(viewers)))
+    return sum(sizes), time.perf_counter() - start
+
+def push(app, base_url: str, viewers: int, changes: int) -> tuple:
+    '''
+    Opens a stream for every viewer and makes changes to the dashboard.
+
+    Parameters:
+        - app: The app module, as given by start_app.
+        - base_url (string): The base URL of the server.
+        - viewers (int): The number of viewers.
+        - changes (int): The number of changes to push.
+
+    Returns the bytes received and the seconds taken.
+    '''
+    streams = [requests.get(base_url + '/events', stream=True) for viewer in range(viewers)]
+    received = []
+    def read(stream):
+        size = events = 0
+        for line in stream.iter_lines():
+            size += len(line) + 1
+            if line.startswith(b'data:'):
+                events += 1
+                if events == changes + 1:
+                    break
+        received.append(size)
+    readers = [Thread(target=read, args=(stream,)) for stream in streams]
+    for reader in readers:
+        reader.start()
+    while len(app.live) < viewers:
+        time.sleep(0.01)
+    start = time.perf_counter()
+    for change in range(changes):
+        app.state.update(lambda current: current._replace(local_infections='load test ' + str(change)))
+    for reader in readers:
+        reader.join()
+    for stream in streams:
+        stream.close()
+    return sum(received), time.perf_counter() - start
+
+def main(viewers: int = 50, changes: int = 5):
+    '''
+    Runs both ways and prints the traffic per hour, assuming the data changes 'changes' times an hour.
+
+    Parameters:
+        - viewers (int): Defaultly set to 50; the number of open dashboards.
+        - changes (int): Defaultly set to 5; the number of changes in an hour.
+    '''
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            app = start_app(directory, api_stub.serve())
+            base_url = serve(app)
+            polled, poll_seconds = poll(base_url, viewers)
+            pushed, push_seconds = push(app, base_url, viewers, changes)
+        finally:
+            os.chdir(PROJECT_DIR)
+    print('viewers: {}, changes an hour: {}'.format(viewers, changes))
+    print('polling: {} requests, {:.1f} MB an hour ({:.3f} s per round of reloads)'.format(
+        viewers * POLLS_PER_HOUR, polled * POLLS_PER_HOUR / 1e6, poll_seconds))
+    print('pushing: {} connections, {:.3f} MB an hour ({:.3f} s to push every change)'.format(
+        viewers, pushed / 1e6, push_seconds))
+    print('traffic saved: {:.0f}x'.format(polled * POLLS_PER_HOUR / max(pushed, 1)))
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,222 @@
+'''
+Module name: run_benchmarks.py
+
+Description:
+    - Offline benchmark suite for the data, news and web paths of the dashboard:
+        - parse_csv_data and process_covid_csv_data on the nation fixture and on a scaled-up copy.
+        - covid_API_request (with and without saving to the covid history store) and get_news,
+          against local stubs of the APIs (see api_stub.py).
+        - '/index' when the page is cached, when it has to be rendered again and when the browser already has it.
+    - The app runs in a temporary directory, so no real API is called and no project file is changed.
+    - Each benchmark prints its mean, median, 95th and 99th percentile latency and its throughput.
+      Results can be saved to 'benchmarks/results', and a saved result can be compared with a new run,
+      which fails if a benchmark's median got slower than the tolerance allows.
+
+Usage (from the 'programming project' directory):
+    python benchmarks/run_benchmarks.py [names...] [--scale 20] [--runs 50] [--save NAME] [--compare NAME] [--tolerance 0.25]
+
+Author: Destyny Ho
+'''
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+sys.path.insert(0, PROJECT_DIR)
+
+import api_stub
+from bench_covid_ingest import load_fixture
+
+def time_runs(function, runs: int) -> dict:
+    '''
+    Times a function, after one untimed run to warm it up.
+
+    Parameters:
+        - function: The function to time.
+        - runs (int): The number of timed runs.
+
+    Returns the latency statistics, in milliseconds, and the runs per second.
+    '''
+    function()
+    timings = []
+    for run in range(runs):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    return {'runs': runs,
+            'mean_ms': float(timings.mean()),
+            'p50_ms': float(np.percentile(timings, 50)),
+            'p95_ms': float(np.percentile(timings, 95)),
+            'p99_ms': float(np.percentile(timings, 99)),
+            'per_second': float(1000 / timings.mean())}
+
+def start_app(directory: str, stub_url: str):
+    '''
+    Imports the app in a temporary directory, with the covid and news APIs pointed at the stubs,
+    and waits for its warm-up to fetch from them.
+
+    Parameters:
+        - directory (string): The temporary directory.
+        - stub_url (string): The base URL of the API stubs.
+
+    Returns the app module.
+    '''
+    shutil.copy(os.path.join(PROJECT_DIR, 'config.json'), directory)
+    os.chdir(directory)
+    import covid_data_handler
+    import covid_news_handling
+    covid_data_handler.COVID_API_URL = stub_url + '/v1/data'
+    covid_news_handling.NEWS_API_URL = stub_url + '/v2/everything'
+    covid_news_handling.news_api_key = 'benchmark'
+    #The stub has no result limit, so every page of the scaled-up news is fetched.
+    covid_news_handling.news_result_limit = 0
+    import app
+    deadline = time.monotonic() + 30
+    while not app.state.get().articles and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return app
+
+def benchmarks(app, directory: str, scale: int) -> dict:
+    '''
+    Gets the benchmarks to run.
+
+    Parameters:
+        - app: The app module, as given by start_app.
+        - directory (string): The temporary directory, for the scaled-up csv file.
+        - scale (int): How many times the fixtures are repeated for the scaled-up benchmarks.
+
+    Returns a dictionary of functions, keyed by the benchmark names.
+    '''
+    from covid_data_handler import parse_csv_data, process_covid_csv_data, covid_API_request, write_covid_snapshot
+    csv_filename = os.path.join(PROJECT_DIR, 'nation_2021-10-28.csv')
+    scaled_filename = os.path.join(directory, 'nation_scaled.csv')
+    write_covid_snapshot(load_fixture(scale), os.path.join(directory, 'nation_scaled.json'), scaled_filename)
+    rows = parse_csv_data(csv_filename)
+    client = app.app.test_client()
+    etag = client.get('/index').headers['ETag']
+    def index_render():
+        #Every change makes a new snapshot, so the page cannot come from the cache.
+        app.state.update(lambda current: current._replace(local_infections=current.version))
+        client.get('/index')
+    return {'parse_csv_data': lambda: parse_csv_data(csv_filename),
+            'parse_csv_data_scaled': lambda: parse_csv_data(scaled_filename),
+            'process_covid_csv_data': lambda: process_covid_csv_data(rows),
+            'covid_API_request': lambda: covid_API_request('England', 'nation', snapshot=False),
+            'covid_API_request_store': lambda: covid_API_request('England', 'nation'),
+            'get_news': app.get_news,
+            'index_cached': lambda: client.get('/index'),
+            'index_render': index_render,
+            'index_not_modified': lambda: client.get('/index', headers={'If-None-Match': etag})}
+
+def commit() -> str:
+    '''
+    Gets the current git commit, or None if it is not known.
+    '''
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(names: list, scale: int, runs: int) -> dict:
+    '''
+    Runs the benchmarks.
+
+    Parameters:
+        - names (list): The benchmarks to run, or an empty list for all of them.
+        - scale (int): How many times the fixtures are repeated.
+        - runs (int): The number of timed runs of each benchmark.
+
+    Returns the results, with details of the run.
+    '''
+    results = {'created': datetime.now().isoformat(timespec='seconds'), 'commit': commit(),
+               'python': platform.python_version(), 'machine': platform.machine(),
+               'scale': scale, 'benchmarks': {}}
+    stub_url = api_stub.serve(scale)
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            app = start_app(directory, stub_url)
+            for name, function in benchmarks(app, directory, scale).items():
+                if names and name not in names:
+                    continue
+                results['benchmarks'][name] = stats = time_runs(function, runs)
+                print('{:<26} mean {:9.3f} ms  p50 {:9.3f} ms  p95 {:9.3f} ms  p99 {:9.3f} ms  {:10.1f}/s'.format(
+                    name, stats['mean_ms'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms'], stats['per_second']))
+        finally:
+            os.chdir(PROJECT_DIR)
+    return results
+
+def results_filename(name: str) -> str:
+    '''
+    Gets the file a result is saved to: the name itself if it is a path, otherwise 'benchmarks/results/<name>.json'.
+
+    Parameters:
+        - name (string): The name or path of the result.
+    '''
+    if name.endswith('.json') or os.sep in name:
+        return name
+    return os.path.join(RESULTS_DIR, name + '.json')
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    '''
+    Compares the median latency of every benchmark with a saved result.
+
+    Parameters:
+        - results (dictionary): The new results.
+        - baseline (dictionary): The saved results.
+        - tolerance (float): How much slower, as a fraction, a benchmark can be before it counts as a regression.
+
+    Returns the names of the benchmarks which regressed.
+    '''
+    regressions = []
+    print('compared with {} (commit {}):'.format(baseline.get('created'), baseline.get('commit')))
+    for name, stats in results['benchmarks'].items():
+        before = baseline['benchmarks'].get(name)
+        if before is None:
+            continue
+        ratio = stats['p50_ms'] / before['p50_ms']
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            regressions.append(name)
+        print('{:<26} {:9.3f} ms -> {:9.3f} ms  {:6.2f}x{}'.format(
+            name, before['p50_ms'], stats['p50_ms'], ratio, '  REGRESSION' if regressed else ''))
+    return regressions
+
+def main():
+    '''
+    Runs the suite from the command line. Exits with status 1 if a regression is found.
+    '''
+    parser = argparse.ArgumentParser(description='Offline benchmark suite for the covid dashboard.')
+    parser.add_argument('names', nargs='*', help='the benchmarks to run (all of them by default)')
+    parser.add_argument('--scale', type=int, default=20, help='how many times the fixtures are repeated')
+    parser.add_argument('--runs', type=int, default=50, help='the number of timed runs of each benchmark')
+    parser.add_argument('--save', help='save the results under this name (or path)')
+    parser.add_argument('--compare', help='compare with the results saved under this name (or path)')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='how much slower a median can be before it is a regression')
+    args = parser.parse_args()
+    results = run(args.names, args.scale, args.runs)
+    if args.save:
+        filename = results_filename(args.save)
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with open(filename, 'w', encoding="utf8") as outfile:
+            json.dump(results, outfile, indent=2)
+        print('saved to', filename)
+    if args.compare:
+        with open(results_filename(args.compare), encoding="utf8") as infile:
+            if compare(results, json.load(infile), args.tolerance):
+                sys.exit(1)
+
+if __name__ == '__main__':
+    main()
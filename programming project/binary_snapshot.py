@@ -0,0 +1,132 @@
+'''
+Module name: binary_snapshot.py
+
+Description:
+    - Module containing the binary snapshot files used for fast restarts.
+    - The covid series is saved as a NumPy array of fixed-width records (area, date and one column per metric).
+    - The articles are saved as one block of JSON text with an array of offsets, so any article can be read on its own.
+    - The files are written under a temporary name and renamed, and loaded with mmap,
+      so nothing is parsed until it is used and several processes share the same pages in memory.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import json
+import os
+from threading import get_ident
+import numpy as np
+from covid_store import METRICS, metric_number
+
+def covid_dtype(name_width: int = 1) -> np.dtype:
+    '''
+    Gets the record type of the covid series.
+
+    Parameters:
+        - name_width (int): Defaultly set to 1; the number of characters kept of the area names.
+    '''
+    return np.dtype([('areaName', 'U' + str(max(name_width, 1))), ('date', 'datetime64[D]')] +
+                    [(metric, '<f8') for metric in METRICS])
+
+def covid_series(rows: list) -> np.ndarray:
+    '''
+    Converts covid API rows into a record array, keeping their order. Missing values become NaN.
+
+    Parameters:
+        - rows (list): The rows of a covid API response.
+
+    Returns the record array.
+    '''
+    rows = [row for row in rows if row.get('date') not in (None, '', 'date')]
+    series = np.empty(len(rows), dtype=covid_dtype(max((len(row.get('areaName') or '') for row in rows), default=1)))
+    series['areaName'] = [row.get('areaName') or '' for row in rows]
+    series['date'] = [row['date'] for row in rows]
+    for metric in METRICS:
+        series[metric] = [np.nan if value is None else value
+                          for value in (metric_number(row.get(metric)) for row in rows)]
+    return series
+
+def save_array(filename: str, array: np.ndarray):
+    '''
+    Saves an array to a .npy file, replacing the old file in one step.
+
+    Parameters:
+        - filename (string): The file to write to.
+        - array (array): The array to save.
+    '''
+    temporary = filename + '.' + str(get_ident()) + '.tmp'
+    with open(temporary, 'wb') as outfile:
+        np.save(outfile, array)
+    os.replace(temporary, filename)
+
+def load_array(filename: str):
+    '''
+    Maps a .npy file into memory without reading it.
+
+    Parameters:
+        - filename (string): The file to load.
+
+    Returns the read-only array, or None if the file does not exist.
+    '''
+    if not os.path.exists(filename):
+        return None
+    return np.load(filename, mmap_mode='r')
+
+def save_articles(filename: str, articles: list):
+    '''
+    Saves articles as one array of bytes: the number of articles, the offsets of each article, then the articles as JSON.
+
+    Parameters:
+        - filename (string): The file to write to.
+        - articles (list): The articles to save.
+    '''
+    encoded = [json.dumps(article).encode('utf8') for article in articles]
+    offsets = np.concatenate(([0], np.cumsum([len(article) for article in encoded], dtype=np.int64)))
+    header = np.concatenate(([len(encoded)], offsets)).astype('<i8')
+    save_array(filename, np.frombuffer(header.tobytes() + b''.join(encoded), dtype=np.uint8))
+
+class MappedArticles:
+    '''
+    Reads the articles of a file written by save_articles, decoding each article only when it is used.
+
+    Parameters:
+        - array (array): The bytes of the file, as given by load_array.
+    '''
+    def __init__(self, array: np.ndarray):
+        self._array = array
+        count = int(array[:8].view('<i8')[0])
+        self._offsets = array[8:8 * (count + 2)].view('<i8')
+        self._start = 8 * (count + 2)
+
+    def __len__(self) -> int:
+        '''
+        Gets the number of articles.
+        '''
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> dict:
+        '''
+        Decodes one article.
+
+        Parameters:
+            - index (int): The position of the article.
+        '''
+        if not -len(self) <= index < len(self):
+            raise IndexError('article index out of range')
+        index %= len(self)
+        start, end = self._start + int(self._offsets[index]), self._start + int(self._offsets[index + 1])
+        return json.loads(self._array[start:end].tobytes())
+
+def load_articles(filename: str):
+    '''
+    Maps a file written by save_articles into memory.
+
+    Parameters:
+        - filename (string): The file to load.
+
+    Returns the articles, or None if the file does not exist.
+    '''
+    array = load_array(filename)
+    if array is None:
+        return None
+    return MappedArticles(array)
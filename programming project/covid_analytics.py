@@ -0,0 +1,108 @@
+'''
+Module name: covid_analytics.py
+
+Description:
+    - Module containing the derived covid series served by the '/analytics' endpoint:
+      7 day rolling averages and totals, rates per 100,000 people, week-on-week change and the hospital trend.
+    - Every series is computed in one vectorised pass over an area's history in the covid history store,
+      and cached until the store's data changes.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from covid_data_handler import get_covid_store
+
+COLUMNS = ('date', 'cases', 'cases_7day_average', 'cases_7day_total', 'cases_7day_per_100k',
+           'week_on_week_change', 'hospital_cases', 'hospital_week_change', 'hospital_trend', 'deaths')
+
+def analytics_frame(history: list, population: int = None):
+    '''
+    Computes the derived series of an area for every date.
+        - cases_7day_average and cases_7day_total: over the 7 days up to each date (missing if any day is missing).
+        - cases_7day_per_100k: the 7 day total per 100,000 people, if the population is known.
+        - week_on_week_change: the percentage change of the 7 day total from a week before.
+        - hospital_week_change and hospital_trend: the change in hospital cases from a week before,
+          and whether they are 'rising', 'falling' or 'flat'.
+
+    Parameters:
+        - history (list): The (date, cases, hospital cases, total deaths) tuples from CovidStore.history, oldest first.
+        - population (int): Defaultly set to None; the number of people living in the area.
+
+    Returns a DataFrame with the columns in COLUMNS, newest first.
+    '''
+    frame = pd.DataFrame(history, columns=['date', 'cases', 'hospital_cases', 'deaths'])
+    if frame.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    #Every day is given a row, so that the windows are 7 days long even when a day is missing.
+    frame.index = pd.to_datetime(frame['date'])
+    frame = frame.drop(columns='date').astype(float).asfreq('D')
+    cases_7day = frame['cases'].rolling(7, min_periods=7).sum()
+    week_before = cases_7day.shift(7)
+    hospital_change = frame['hospital_cases'] - frame['hospital_cases'].shift(7)
+    analytics = pd.DataFrame({
+        'date': frame.index.strftime('%Y-%m-%d'),
+        'cases': frame['cases'],
+        'cases_7day_average': (cases_7day / 7).round(1),
+        'cases_7day_total': cases_7day,
+        'cases_7day_per_100k': (cases_7day / population * 100_000).round(1) if population else np.nan,
+        'week_on_week_change': ((cases_7day - week_before) / week_before.replace(0, np.nan) * 100).round(1),
+        'hospital_cases': frame['hospital_cases'],
+        'hospital_week_change': hospital_change,
+        'hospital_trend': np.select([hospital_change > 0, hospital_change < 0, hospital_change == 0],
+                                    ['rising', 'falling', 'flat'], None),
+        'deaths': frame['deaths']}, columns=COLUMNS)
+    counts = ['cases', 'cases_7day_total', 'hospital_cases', 'hospital_week_change', 'deaths']
+    analytics[counts] = analytics[counts].round().astype('Int64')
+    return analytics.iloc[::-1].reset_index(drop=True)
+
+@lru_cache(maxsize=32)
+def _cached_analytics(area_name: str, population: int, version: int):
+    '''
+    Computes the derived series of an area from the covid history store.
+    The result is cached until the store's version changes.
+
+    Parameters:
+        - area_name (string): The name of the area.
+        - population (int): The number of people living in the area, or None.
+        - version (int): The version of the store.
+    '''
+    return analytics_frame(get_covid_store().history(area_name), population)
+
+def area_analytics(area_name: str, population: int = None):
+    '''
+    Gets the derived series of an area, computing them only if the stored data has changed.
+
+    Parameters:
+        - area_name (string): The name of the area.
+        - population (int): Defaultly set to None; the number of people living in the area.
+
+    Returns the DataFrame from analytics_frame and the version of the stored data.
+    '''
+    version = get_covid_store().version()
+    return _cached_analytics(area_name, population, version), version
+
+def analytics_page(analytics, start: str = None, end: str = None, page: int = 1, page_size: int = 100) -> dict:
+    '''
+    Gets one page of the derived series, between two dates.
+
+    Parameters:
+        - analytics (DataFrame): The derived series, as given by analytics_frame.
+        - start (string): Defaultly set to None; the first date to include, as 'YYYY-MM-DD'.
+        - end (string): Defaultly set to None; the last date to include, as 'YYYY-MM-DD'.
+        - page (int): Defaultly set to 1; the page to get, newest dates first.
+        - page_size (int): Defaultly set to 100; the number of dates on each page.
+
+    Returns a dictionary with the rows of the page under 'data', and the total number of rows and pages.
+    Missing values are None.
+    '''
+    dates = analytics['date']
+    selected = analytics[(dates >= (start or '')) & (dates <= (end or '9999-99-99'))]
+    rows = selected.iloc[(page - 1) * page_size:page * page_size]
+    rows = rows.astype(object).where(rows.notna(), None)
+    return {'page': page, 'page_size': page_size, 'total': len(selected),
+            'pages': -(-len(selected) // page_size),
+            'data': rows.to_dict(orient='records')}
@@ -8,97 +8,402 @@ Last modified on: 02/12/21
 
 Author: Destyny Ho
 '''
+import asyncio
 import csv
 import json
-import sched
-import time
-from uk_covid19 import Cov19API
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import Thread, get_ident
+from time import perf_counter
+import numpy as np
 import pandas as pd
+from http_session import http_client
+from covid_store import CovidStore, metric_number
+from binary_snapshot import covid_series, save_array, load_array
+from metrics import span, timed
 
-scheduler = sched.scheduler(time.time, time.sleep)
+COVID_API_URL = 'https://api.coronavirus.data.gov.uk/v1/data'
 
+covid_store = None
+text_snapshots = None
+
+def get_covid_store() -> CovidStore:
+    '''
+    Opens the covid history store the first time it is needed.
+
+    Returns the covid history store.
+    '''
+    global covid_store
+    if covid_store is None:
+        covid_store = CovidStore()
+    return covid_store
+
+@lru_cache(maxsize=None)
+def _csv_row_type(headings: tuple):
+    '''
+    Makes the row type shared by every row of a csv file with these headings.
+
+    Parameters:
+        - headings (tuple): The headings of the csv file.
+    '''
+    return namedtuple('CsvRow', headings, rename=True)
+
+def iter_csv_data(csv_filename):
+    '''
+    Reads a csv file one row at a time, so the whole file is never held in memory.
+    Each row is a named tuple; the headings are stored once in the row type rather than in every row.
+
+    Parameters:
+        - csv_filename: The filename of the csv to be read.
+
+    Yields the rows of the csv file, without the headings.
+    '''
+    with open(csv_filename, 'r', encoding="utf8", newline='') as infile:
+        reader = csv.reader(infile)
+        headings = next(reader, None)
+        if headings is None:
+            return
+        row_type = _csv_row_type(tuple(headings))
+        for columns in reader:
+            yield row_type._make(columns)
+
+@timed('parse_csv_data')
 def parse_csv_data(csv_filename):
     '''
-    Converts a csv file into a dictionary.
+    Converts a csv file into a list of dictionaries.
+    Kept for compatibility; iter_csv_data should be used for large files.
 
     Parameters:
         - csv_filename: The filename of the csv to be parsed.
     '''
-    with open(csv_filename, 'r', encoding="utf8") as infile:
+    with open(csv_filename, 'r', encoding="utf8", newline='') as infile:
         reader = csv.reader(infile)
-        words = {}
-        superlist = []
-        for rows in reader:
-            for columns in reader:
-                words = {rows[0]:columns[0], rows[1]:columns[1],
-                         rows[2]:columns[2], rows[3]:columns[3],
-                         rows[4]:columns[4], rows[5]:columns[5],
-                         rows[6]:columns[6]}
-                superlist.append(words)
-        '''This piece of code below is simply to pass the assertion test.
-        My original code did not include the headings of each column in my list because it was not necessary.
+        #The dictionaries are keyed by the headings as written, which the named tuples of iter_csv_data may rename.
+        headings = next(reader, None)
+        if headings is None:
+            return []
+        superlist = [dict(zip(headings, columns)) for columns in reader]
+    if superlist:
+        '''The headings of each column are added on at the end of the list to pass the assertion test.
+        My original code did not include the headings because it was not necessary.
         Hence, the length of my original list was 638.
         '''
-        superlist.append({rows[0]:rows[0], rows[1]:rows[1],
-                         rows[2]:rows[2], rows[3]:rows[3],
-                         rows[4]:rows[4], rows[5]:rows[5],
-                         rows[6]:rows[6]})
-        return superlist
+        superlist.append(dict(zip(headings, headings)))
+    return superlist
+
+def _number(row, metric: str):
+    '''
+    Gets the value of a metric from a row as an integer.
+
+    Parameters:
+        - row: A dictionary (from parse_csv_data or the covid API) or a named tuple (from iter_csv_data).
+        - metric (string): The name of the metric.
+
+    Returns the value, or None if the row has no value for the metric.
+    '''
+    return metric_number(row.get(metric) if isinstance(row, dict) else getattr(row, metric, None))
+
+def _latest_value_index(values, group_start):
+    '''
+    Finds, for every position, the latest position at or before it in the same area which has a value.
+
+    Parameters:
+        - values (array): The values of a metric, oldest first, with NaN where there is no value.
+        - group_start (array): The first position of the area of every position.
+
+    Returns an array of positions, with -1 where no earlier position in the area has a value.
+    '''
+    positions = np.where(np.isnan(values), -1, np.arange(len(values)))
+    if len(positions):
+        positions = np.maximum.accumulate(positions)
+    return np.where(positions >= group_start, positions, -1)
+
+def _metric_values(covid_frame, metric: str):
+    '''
+    Converts a metric column into a float array, with NaN where there is no value.
+
+    Parameters:
+        - covid_frame (DataFrame): The covid data.
+        - metric (string): The name of the metric column.
+    '''
+    if metric not in covid_frame:
+        return np.full(len(covid_frame), np.nan)
+    return pd.to_numeric(covid_frame[metric], errors='coerce').to_numpy(dtype=float)
+
+def covid_metrics_by_date(covid_frame, by: str = None):
+    '''
+    Computes the last 7 days' cases, current hospital cases and total deaths
+    for every date in one pass over the columns.
+    For each date, the values are the ones the dashboard would have shown on that date:
+        - last7: the sum of the 7 days before the latest day with cases (that day is incomplete).
+        - hospital_current: the latest hospital cases.
+        - deaths: the latest total deaths.
+
+    Parameters:
+        - covid_frame (DataFrame): The covid data, newest first, as given by the covid API.
+        - by (string): Defaultly set to None; if given, the column (such as 'areaCode') splitting the data into areas.
+          The rows are then ordered by area and date first, so the dates must be in the covid API's year-month-day format.
+
+    Returns a DataFrame with the columns 'date', 'last7', 'hospital_current' and 'deaths'
+    (and the 'by' column), newest first within each area.
+    '''
+    if by is not None:
+        covid_frame = covid_frame.sort_values([by, 'date'], ascending=[True, False], kind='mergesort')
+    oldest_first = covid_frame.iloc[::-1]
+    positions = np.arange(len(oldest_first))
+    if by is not None:
+        areas = oldest_first[by].to_numpy()
+        new_area = np.concatenate(([True], areas[1:] != areas[:-1]))
+        group_start = np.maximum.accumulate(np.where(new_area, positions, 0))
+    else:
+        group_start = np.zeros(len(positions), dtype=np.int64)
+    cases = _metric_values(oldest_first, 'newCasesBySpecimenDate')
+    hospital = _metric_values(oldest_first, 'hospitalCases')
+    deaths = _metric_values(oldest_first, 'cumDailyNsoDeathsByDeathDate')
+    #cumulative[i] is the sum of the cases before position i.
+    cumulative = np.concatenate(([0.0], np.cumsum(np.nan_to_num(cases))))
+    previous7 = cumulative[positions] - cumulative[np.maximum(positions - 7, group_start)]
+    metrics = {}
+    for name, values, latest in (('last7', previous7, _latest_value_index(cases, group_start)),
+                                 ('hospital_current', hospital, _latest_value_index(hospital, group_start)),
+                                 ('deaths', deaths, _latest_value_index(deaths, group_start))):
+        metrics[name] = np.where(latest >= 0, values[latest], 0).round().astype(np.int64)
+    columns = {'date': oldest_first['date'].to_numpy()}
+    if by is not None:
+        columns[by] = areas
+    metrics_frame = pd.DataFrame({**columns, **metrics})
+    return metrics_frame.iloc[::-1].reset_index(drop=True)
+
+def series_metrics(series, location: str):
+    '''
+    Gets the last 7 days' cases, current hospital cases and total deaths of an area
+    from a covid series (such as a binary snapshot), using covid_metrics_by_date.
+
+    Parameters:
+        - series (array): The covid series from covid_series or load_array, newest first.
+        - location (string): The name of the area.
+
+    Returns the covid updates, or None if the series has no rows for the area.
+    '''
+    rows = series[series['areaName'] == location]
+    if not len(rows):
+        return None
+    latest = covid_metrics_by_date(pd.DataFrame(rows)).iloc[0]
+    return {'last7': int(latest['last7']), 'hospital_current': int(latest['hospital_current']),
+            'deaths': int(latest['deaths'])}
+
+def process_covid_frame_by_area(covid_frame, by: str = 'areaName') -> dict:
+    '''
+    Processes the covid data of many areas at once, using one group-by over the columns,
+    which returns the last 7 days' cases, current hospital cases and total deaths of every area.
+
+    Parameters:
+        - covid_frame (DataFrame): The covid data of many areas, as given by the covid API.
+        - by (string): Defaultly set to 'areaName'; the column naming the areas.
+
+    Returns a dictionary of the covid updates of each area.
+    '''
+    if covid_frame.empty:
+        return {}
+    latest = covid_metrics_by_date(covid_frame, by).drop_duplicates(by, keep='first')
+    return {area: {'last7': int(last7), 'hospital_current': int(hospital_current), 'deaths': int(total_deaths)}
+            for area, last7, hospital_current, total_deaths
+            in zip(latest[by], latest['last7'], latest['hospital_current'], latest['deaths'])}
 
 def process_covid_csv_data(covid_csv_data):
     '''
     Processes csv data which returns
     the last 7 days' cases, current hospital cases and total deaths.
+    The rows are read newest first and reading stops as soon as the
+    7 days of cases, the hospital cases and the total deaths have been found.
 
     Parameters:
-        - covid_csv_data: The data fetched from the csv file using parse_csv_data.
+        - covid_csv_data: The rows fetched from the csv file using iter_csv_data or parse_csv_data,
+          or the rows of a covid API response.
     '''
-    covid_csv_data.pop()
-    #Above, I remove the last element of the list I added on to pass the assertion test.
     last7days_cases = 0
-    current_hospital_cases = 0
-    total_deaths = 0
-    for i in range(len(covid_csv_data)-1):
-        while covid_csv_data[i]['newCasesBySpecimenDate'] == '':
-            i += 1
-            if covid_csv_data[i]['newCasesBySpecimenDate'] != '':
-                break
-        i += 1
-        for temp in range(7):
-            last7days_cases = last7days_cases + int(float(covid_csv_data[i]['newCasesBySpecimenDate']))
-            i += 1
-        break
-    for j in range(len(covid_csv_data)-1):
-        while covid_csv_data[j]['hospitalCases'] == '':
-            j += 1
-            if j > 20:
-                break
-        if covid_csv_data[j]['hospitalCases'] != '':
-            current_hospital_cases = int(float(covid_csv_data[j]['hospitalCases']))
+    days_counted = None
+    current_hospital_cases = None
+    total_deaths = None
+    #Checked once, so that the rows cost nothing to log when debug logging is off.
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    for row in covid_csv_data:
+        date = row.get('date') if isinstance(row, dict) else getattr(row, 'date', None)
+        if date == 'date':
+            #The headings row is added on by parse_csv_data, so it is left out.
+            continue
+        cases = _number(row, 'newCasesBySpecimenDate')
+        if debug:
+            logging.debug('Covid data: %s has %s new cases.', date, cases)
+        if days_counted is None:
+            #The first day with cases is incomplete, so the 7 days after it are summed.
+            if cases is not None:
+                days_counted = 0
+        elif days_counted < 7:
+            last7days_cases = last7days_cases + (cases or 0)
+            days_counted += 1
+        if current_hospital_cases is None:
+            current_hospital_cases = _number(row, 'hospitalCases')
+        if total_deaths is None:
+            total_deaths = _number(row, 'cumDailyNsoDeathsByDeathDate')
+        if days_counted == 7 and current_hospital_cases is not None and total_deaths is not None:
             break
-    for k in range(len(covid_csv_data)-1):
-        while covid_csv_data[k]['cumDailyNsoDeathsByDeathDate'] == '':
-            k += 1
-            if k > 20:
-                break
-        if covid_csv_data[k]['cumDailyNsoDeathsByDeathDate'] != '':
-            total_deaths = int(float(covid_csv_data[k]['cumDailyNsoDeathsByDeathDate']))
-            break
-    return last7days_cases, current_hospital_cases, total_deaths
+    return last7days_cases, current_hospital_cases or 0, total_deaths or 0
 
-def covid_API_request(location: str = "Exeter", location_type: str = "ltla") -> str:
+def process_covid_json_data(covid_json_data: dict):
     '''
-    Uses the covid API to request data from locations parsed as
-    arguments.
+    Processes the covid API response in memory which returns
+    the last 7 days' cases, current hospital cases and total deaths.
+    Gives the same results as writing the response to a csv file and
+    using process_covid_csv_data, without the round trip to disk.
 
     Parameters:
-        - location (string): Defaultly set to 'Exeter'; this takes the location from the config file.
-        - location_type (string): Defaultly set to 'ltla'; this takes the location_type from the config file.
+        - covid_json_data (dictionary): The data fetched from the covid API using get_json.
+    '''
+    return process_covid_csv_data(covid_json_data['data'])
+
+def write_covid_snapshot(data: dict, json_filename: str = 'covid_updates.json',
+                         csv_filename: str = 'covid_updates.csv', binary_filename: str = None):
+    '''
+    Writes the covid API response to a json file and a csv file, and optionally to a binary snapshot file.
+
+    Parameters:
+        - data (dictionary): The data fetched from the covid API using get_json.
+        - json_filename (string): Defaultly set to 'covid_updates.json'; the json file to write to.
+        - csv_filename (string): Defaultly set to 'covid_updates.csv'; the csv file to write to.
+        - binary_filename (string): Defaultly set to None; if given, the .npy file to write the covid series to.
+    '''
+    #The files are written under temporary names and then renamed, so a reader never sees half a file.
+    #The names are unique to the thread, as snapshots of the same area can be written at the same time.
+    temporary = '.' + str(get_ident()) + '.tmp'
+    with span('snapshot_json_dump'), open(json_filename + temporary, 'w', encoding="utf8") as json_file:
+        json.dump(data, json_file)
+    with span('snapshot_normalize'):
+        df = pd.json_normalize(data, "data", errors="ignore")
+    with span('snapshot_csv_write'):
+        df.to_csv(csv_filename + temporary, index = False)
+    os.replace(json_filename + temporary, json_filename)
+    os.replace(csv_filename + temporary, csv_filename)
+    if binary_filename is not None and data['data']:
+        with span('snapshot_binary_write'):
+            save_array(binary_filename, covid_series(data['data']))
+
+def get_text_snapshots() -> bool:
+    '''
+    Reads from the config file, the first time it is needed, whether the json and csv snapshot files are written.
+    Nothing reads them when the covid history store and the binary snapshots are used, so they are off by default.
+
+    Returns True if they are written.
+    '''
+    global text_snapshots
+    if text_snapshots is None:
+        with open('config.json', encoding="utf8") as json_file:
+            text_snapshots = json.load(json_file).get("text snapshots", False)
+    return text_snapshots
+
+def write_snapshot_files(data: dict, location: str, location_type: str):
+    '''
+    Writes an area's binary snapshot file and, if 'text snapshots' is set in the config file, its json and csv files.
+
+    Parameters:
+        - data (dictionary): The data fetched from the covid API using get_json.
+        - location (string): The name of the area, or None for the files holding every area of the type.
+        - location_type (string): The type of the area.
+    '''
+    json_filename, csv_filename, binary_filename = snapshot_filenames(location, location_type)
+    if get_text_snapshots():
+        write_covid_snapshot(data, json_filename, csv_filename, binary_filename)
+    elif data['data']:
+        with span('snapshot_binary_write'):
+            save_array(binary_filename, covid_series(data['data']))
+
+def snapshot_filenames(location: str, location_type: str):
+    '''
+    Gets the snapshot filenames for an area, so that every area has its own files.
+
+    Parameters:
+        - location (string): The name of the area, or None for the files holding every area of the type.
+        - location_type (string): The type of the area.
+
+    Returns the json filename, the csv filename and the binary (.npy) filename.
+    '''
+    area = location_type if location is None else location_type + '_' + location
+    area = 'covid_updates_' + area.lower().replace(' ', '_')
+    return area + '.json', area + '.csv', area + '.npy'
+
+def _newest(*filenames: str):
+    '''
+    Gets the most recently modified of the files which exist.
+
+    Parameters:
+        - filenames (string): The files to compare.
+
+    Returns the filename, or None if none of the files exist.
+    '''
+    existing = [filename for filename in filenames if os.path.exists(filename)]
+    return max(existing, key=os.path.getmtime, default=None)
+
+@lru_cache(maxsize=8)
+def _load_type_snapshot(csv_filename: str, modified: float) -> dict:
+    '''
+    Processes the snapshot file holding every area of a type.
+    The result is cached until the file is modified.
+
+    Parameters:
+        - csv_filename (string): The snapshot file.
+        - modified (float): The time the file was last modified.
+    '''
+    return process_covid_frame_by_area(pd.read_csv(csv_filename))
+
+@timed('load_covid_snapshot')
+def load_covid_snapshot(location: str, location_type: str):
+    '''
+    Gets the covid updates of an area without using the covid API, from (in order of preference):
+        - its binary snapshot file, which is mapped into memory rather than parsed.
+        - the covid history store.
+        - its csv snapshot file.
+    The newest of the area's own file and the file holding every area of its type is used.
+
+    Parameters:
+        - location (string): The name of the area.
+        - location_type (string): The type of the area.
+
+    Returns the covid updates, or None if the area has no snapshot yet.
+    '''
+    binary_filename = _newest(snapshot_filenames(location, location_type)[2],
+                              snapshot_filenames(None, location_type)[2])
+    if binary_filename is not None:
+        snapshot = series_metrics(load_array(binary_filename), location)
+        if snapshot is not None:
+            return snapshot
+    stored = get_covid_store().latest_metrics(location)
+    if stored is not None:
+        return stored
+    csv_filename = snapshot_filenames(location, location_type)[1]
+    type_filename = snapshot_filenames(None, location_type)[1]
+    if os.path.exists(type_filename) and (not os.path.exists(csv_filename)
+                                          or os.path.getmtime(type_filename) > os.path.getmtime(csv_filename)):
+        return _load_type_snapshot(type_filename, os.path.getmtime(type_filename)).get(location)
+    if not os.path.exists(csv_filename):
+        return None
+    last7days_cases, current_hospital_cases, total_deaths = process_covid_csv_data(iter_csv_data(csv_filename))
+    return {'last7' : last7days_cases, 'hospital_current': current_hospital_cases, 'deaths': total_deaths}
+
+@timed('covid_network')
+def get_covid_json(filters: list) -> dict:
+    '''
+    Uses the covid API to request the cases, hospital cases and deaths matching the filters.
+    Every page of results is requested through the shared HTTP client, so connections are reused,
+    and pages which have not changed since the last request are not downloaded again.
+
+    Parameters:
+        - filters (list): The covid API filters, such as 'areaType=ltla'.
+
+    Returns the covid API response.
     '''
-    location_only = [
-    "areaType=" + location_type,
-    "areaName=" + location,
-    ]
     cases_and_deaths = {
     "areaCode": "areaCode",
     "areaName": "areaName",
@@ -109,28 +414,144 @@ def covid_API_request(location: str = "Exeter", location_type: str = "ltla") ->
     "newCasesBySpecimenDate": "newCasesBySpecimenDate",
     }
 
-    api = Cov19API(filters=location_only, structure=cases_and_deaths)
-    data = api.get_json()
-    with open('covid_updates.json', 'w', encoding="utf8") as json_file:
-        json.dump(data, json_file)
-    df = pd.json_normalize(data, "data", errors="ignore")
-    df.to_csv('covid_updates.csv', index = False)
-    last7days_cases, current_hospital_cases, total_deaths = process_covid_csv_data(parse_csv_data('covid_updates.csv'))
-    covid_updates = {'last7' : last7days_cases, 'hospital_current': current_hospital_cases, 'deaths': total_deaths}
+    params = {'filters': ';'.join(filters),
+              'structure': json.dumps(cases_and_deaths, separators=(',', ':')),
+              'format': 'json'}
+    data = []
+    page = 1
+    while True:
+        response = http_client.get_json(COVID_API_URL, params=dict(params, page=page))
+        if response is None:
+            break
+        data.extend(response.get('data', []))
+        if not (response.get('pagination') or {}).get('next'):
+            break
+        page += 1
+    return {'data': data, 'length': len(data), 'totalPages': page}
+
+@timed('covid_API_request')
+def covid_API_request(location: str = "Exeter", location_type: str = "ltla",
+                      snapshot: bool = True) -> dict:
+    '''
+    Uses the covid API to request data from locations parsed as
+    arguments.
+    The response is saved to the covid history store, which only writes the days that are new or changed,
+    and the values come from indexed queries on the store. The snapshot files (see write_snapshot_files)
+    are written in the background so the request does not wait on them.
+
+    Parameters:
+        - location (string): Defaultly set to 'Exeter'; this takes the location from the config file.
+        - location_type (string): Defaultly set to 'ltla'; this takes the location_type from the config file.
+        - snapshot (bool): Defaultly set to True; if True, the response is saved to the covid history store
+          and to the area's snapshot files. If False, the values are computed from the response in memory.
+    '''
+    started = perf_counter()
+    location_only = [
+    "areaType=" + location_type,
+    "areaName=" + location,
+    ]
+    data = get_covid_json(location_only)
+    if snapshot:
+        Thread(target=write_snapshot_files, args=(data, location, location_type), daemon=True).start()
+        store = get_covid_store()
+        with span('covid_store_upsert'):
+            store.upsert(data['data'])
+        with span('covid_store_query'):
+            covid_updates = store.latest_metrics(location)
+    if not snapshot or covid_updates is None:
+        with span('covid_process'):
+            last7days_cases, current_hospital_cases, total_deaths = process_covid_json_data(data)
+        covid_updates = {'last7' : last7days_cases, 'hospital_current': current_hospital_cases, 'deaths': total_deaths}
+    logging.info('%s: Covid data fetched.', location,
+                 extra={'area': location, 'duration': perf_counter() - started})
     return covid_updates
-    
 
-def schedule_covid_updates(update_interval: int, update_name: str) -> str:
+def covid_API_requests(areas: list, snapshot: bool = True) -> dict:
     '''
-    Schedules updates using the sched module.
-    NOTE: Not used in app.py because I opted to use the threading option instead.
+    Uses the covid API to request data for several areas at the same time,
+    so the time taken is about that of the slowest request.
 
     Parameters:
-        - update_interval (int): Takes an interval for updates to happen.
-        - update_name (string): Takes the update name.
+        - areas (list): The (location, location_type) pairs to request.
+        - snapshot (bool): Defaultly set to True; passed on to covid_API_request.
+
+    Returns a dictionary of the covid updates of each location.
+    '''
+    if not areas:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(areas)) as executor:
+        futures = {location: executor.submit(covid_API_request, location, location_type, snapshot)
+                   for location, location_type in areas}
+    return {location: future.result() for location, future in futures.items()}
+
+@timed('covid_API_request_by_type')
+def covid_API_request_by_type(location_type: str, snapshot: bool = True) -> dict:
+    '''
+    Uses the covid API to request data for every area of a type in one query,
+    then splits the response into areas with process_covid_frame_by_area.
+
+    Parameters:
+        - location_type (string): The type of the areas, such as 'ltla'.
+        - snapshot (bool): Defaultly set to True; if True, the response is also saved to the covid history store
+          and to the type's snapshot files.
+
+    Returns a dictionary of the covid updates of each area.
+    '''
+    started = perf_counter()
+    data = get_covid_json(["areaType=" + location_type])
+    if snapshot:
+        Thread(target=write_snapshot_files, args=(data, None, location_type), daemon=True).start()
+        with span('covid_store_upsert'):
+            get_covid_store().upsert(data['data'])
+    with span('covid_process_by_area'):
+        covid_updates = process_covid_frame_by_area(pd.DataFrame(data['data']))
+    #One record for the whole type, as a type can have hundreds of areas.
+    logging.info('%s: Covid data fetched for %s areas.', location_type, len(covid_updates),
+                 extra={'area': location_type, 'duration': perf_counter() - started})
+    return covid_updates
+
+def covid_API_requests_batched(areas: list, snapshot: bool = True) -> dict:
+    '''
+    Uses the covid API to request data for many areas with one query per area type.
+    Types with a single area are requested for that area only, as that response is much smaller.
+    The queries are made at the same time.
+
+    Parameters:
+        - areas (list): The (location, location_type) pairs to request.
+        - snapshot (bool): Defaultly set to True; passed on to the requests.
+
+    Returns a dictionary of the covid updates of each location.
+    Locations the covid API does not know are left out.
+    '''
+    locations_by_type = {}
+    for location, location_type in areas:
+        locations_by_type.setdefault(location_type, []).append(location)
+    def request_type(location_type: str, locations: list) -> dict:
+        if len(locations) == 1:
+            return {locations[0]: covid_API_request(locations[0], location_type, snapshot)}
+        return covid_API_request_by_type(location_type, snapshot)
+    if not locations_by_type:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(locations_by_type)) as executor:
+        futures = {location_type: executor.submit(request_type, location_type, locations)
+                   for location_type, locations in locations_by_type.items()}
+    updates_by_type = {location_type: future.result() for location_type, future in futures.items()}
+    return {location: updates_by_type[location_type][location] for location, location_type in areas
+            if location in updates_by_type[location_type]}
+
+async def covid_API_request_async(location: str = "Exeter", location_type: str = "ltla",
+                                  snapshot: bool = True) -> dict:
+    '''
+    Async variant of covid_API_request. The request runs in a worker thread,
+    so the event loop is not blocked while waiting for the covid API.
+    The parameters are those of covid_API_request.
+    '''
+    return await asyncio.to_thread(covid_API_request, location, location_type, snapshot)
+
+async def covid_API_requests_batched_async(areas: list, snapshot: bool = True) -> dict:
+    '''
+    Async variant of covid_API_requests_batched. The requests run in worker threads,
+    so the event loop is not blocked while waiting for the covid API.
+    The parameters are those of covid_API_requests_batched.
     '''
-    scheduler.enter(update_interval, 0.5, schedule_covid_updates,
-                    (update_interval, covid_API_request))
-    covid_API_request()
-    scheduler.run()
-    return update_name
+    return await asyncio.to_thread(covid_API_requests_batched, areas, snapshot)
@@ -8,50 +8,309 @@ Last modified on: 02/12/21
 
 Author: Destyny Ho
 '''
+import asyncio
 import json
-from datetime import date, timedelta
-import pandas as pd
-from newsapi import NewsApiClient
+import logging
+import math
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from threading import Lock
+from time import perf_counter
+import requests
+from http_session import http_client
+from binary_snapshot import save_articles, load_articles
+from metrics import timed
 
-today = date.today()
-twodaysago = today - timedelta(2)
-today = today.strftime("%Y-%m-%d")
-twodaysago = twodaysago.strftime('%Y-%m-%d')
+NEWS_API_URL = 'https://newsapi.org/v2/everything'
+#The number of new articles logged one by one at the debug level on each update.
+ARTICLES_LOGGED = 10
 
-with open('config.json', encoding="utf8") as json_file:
-    data = json.load(json_file)
-    api = data["API key"]
+news_api_key = None
+news_result_limit = None
+article_store = None
 
-newsapi = NewsApiClient(api_key=api)
+def get_news_api_key():
+    '''
+    Reads the News API key from the config file the first time it is needed,
+    so that importing this module does not read the config file.
+
+    Returns the News API key.
+    '''
+    global news_api_key
+    if news_api_key is None:
+        with open('config.json', encoding="utf8") as json_file:
+            data = json.load(json_file)
+            news_api_key = data["API key"]
+    return news_api_key
+
+def get_news_result_limit() -> int:
+    '''
+    Reads the number of results the News API plan gives for one search from the config file,
+    the first time it is needed. A developer key gives 100 results; asking for more is refused.
+
+    Returns the result limit, or 0 if there is none.
+    '''
+    global news_result_limit
+    if news_result_limit is None:
+        with open('config.json', encoding="utf8") as json_file:
+            news_result_limit = json.load(json_file).get("news result limit", 100)
+    return news_result_limit
+
+class ArticleStore:
+    '''
+    Keeps the fetched articles in memory, keyed by URL so that an article is only kept once.
+    The store is bounded, so its size stays the same however long the server runs:
+        - only the newest 'max_articles' articles are kept.
+        - articles published more than 'max_age' before the newest article are dropped.
+    New articles are appended to a file with one article per line, which is rewritten
+    when it holds too many dropped articles. The articles kept are also saved to a binary
+    snapshot file (see binary_snapshot.py), which is loaded instead of the text file when it is newer.
+
+    Parameters:
+        - filename (string): Defaultly set to 'covid_articles.jsonl'; the file the articles are saved to.
+        - max_articles (int): Defaultly set to 100; the most articles kept.
+        - max_age (timedelta): Defaultly set to 2 days; how much older than the newest article an article can be.
+    '''
+    def __init__(self, filename: str = 'covid_articles.jsonl', max_articles: int = 100,
+                 max_age: timedelta = timedelta(days=2)):
+        self.filename = filename
+        self.max_articles = max_articles
+        self.max_age = max_age
+        self.snapshot_filename = os.path.splitext(filename)[0] + '.npy'
+        self._articles = OrderedDict()
+        self._lines = 0
+        self._lock = Lock()
+
+    def load(self):
+        '''
+        Loads the articles saved by earlier runs.
+        '''
+        if not os.path.exists(self.filename):
+            return
+        if os.path.exists(self.snapshot_filename) and \
+                os.path.getmtime(self.snapshot_filename) >= os.path.getmtime(self.filename):
+            with self._lock:
+                for article in load_articles(self.snapshot_filename):
+                    self._add(article)
+                #The number of lines in the text file is not known, so it is rewritten at the next save.
+                self._lines = 2 * self.max_articles
+                self._evict()
+            return
+        with self._lock, open(self.filename, 'r', encoding="utf8") as infile:
+            for line in infile:
+                if line.strip():
+                    self._add(json.loads(line))
+                    self._lines += 1
+            self._evict()
+
+    def merge(self, articles: list) -> list:
+        '''
+        Adds the articles which are not in the store yet, and saves them.
+
+        Parameters:
+            - articles (list): The articles from the news API.
+
+        Returns the articles which were new.
+        '''
+        with self._lock:
+            new_articles = [article for article in articles if self._add(article)]
+            self._evict()
+            new_articles = [article for article in new_articles if article.get('url') in self._articles]
+            if new_articles:
+                self._append(new_articles)
+        return new_articles
+
+    def articles(self) -> list:
+        '''
+        Gets the articles in the store, newest first.
+        '''
+        with self._lock:
+            articles = list(self._articles.values())
+        return sorted(articles, key=lambda article: article.get('publishedAt') or '', reverse=True)
+
+    def latest_published(self):
+        '''
+        Gets the time the newest article was published, or None if the store is empty.
+        '''
+        with self._lock:
+            return max((article.get('publishedAt') or '' for article in self._articles.values()), default=None)
+
+    def __len__(self) -> int:
+        '''
+        Gets the number of articles in the store.
+        '''
+        return len(self._articles)
+
+    def _add(self, article: dict) -> bool:
+        '''
+        Adds an article unless its URL is already in the store.
+
+        Parameters:
+            - article (dictionary): The article.
+
+        Returns whether the article was added.
+        '''
+        url = article.get('url')
+        if not url or url in self._articles:
+            return False
+        self._articles[url] = article
+        return True
+
+    def _evict(self):
+        '''
+        Drops articles which are too old, then the oldest articles while there are too many.
+        '''
+        newest = max((article.get('publishedAt') or '' for article in self._articles.values()), default='')
+        if newest:
+            cutoff = (datetime.strptime(newest[:19], '%Y-%m-%dT%H:%M:%S') - self.max_age).strftime('%Y-%m-%dT%H:%M:%S')
+            for url in [url for url, article in self._articles.items() if (article.get('publishedAt') or '') < cutoff]:
+                del self._articles[url]
+        if len(self._articles) > self.max_articles:
+            oldest_first = sorted(self._articles, key=lambda url: self._articles[url].get('publishedAt') or '')
+            for url in oldest_first[:len(self._articles) - self.max_articles]:
+                del self._articles[url]
 
-def news_API_request(covid_terms: str = "Covid COVID-19 coronavirus"):
+    def _append(self, articles: list):
+        '''
+        Appends articles to the file, rewriting the file if most of its lines are dropped articles,
+        then saves the binary snapshot.
+
+        Parameters:
+            - articles (list): The articles to save.
+        '''
+        if self._lines + len(articles) > 2 * self.max_articles:
+            with open(self.filename + '.tmp', 'w', encoding="utf8") as outfile:
+                for article in self._articles.values():
+                    outfile.write(json.dumps(article) + '\n')
+            os.replace(self.filename + '.tmp', self.filename)
+            self._lines = len(self._articles)
+        else:
+            with open(self.filename, 'a', encoding="utf8") as outfile:
+                for article in articles:
+                    outfile.write(json.dumps(article) + '\n')
+            self._lines += len(articles)
+        save_articles(self.snapshot_filename, list(self._articles.values()))
+
+def get_article_store() -> ArticleStore:
+    '''
+    Creates the article store the first time it is needed, loading the articles saved by earlier runs.
+
+    Returns the article store.
+    '''
+    global article_store
+    if article_store is None:
+        store = ArticleStore()
+        store.load()
+        article_store = store
+    return article_store
+
+@timed('news_API_request')
+def news_API_request(covid_terms: str = "Covid COVID-19 coronavirus", from_param: str = None,
+                     page: int = 1, page_size: int = 100):
     '''
     Fetches all the covid articles that include the terms parsed into the argument.
 
     Parameters:
         - covid_terms (string): Set defaultly to "Covid COVID-19 coronavirus", this searches all the terms for covid in the news articles.
+        - from_param (string): Set defaultly to None; the time of the oldest article to fetch. If None, articles from the last two days are fetched.
+        - page (int): Set defaultly to 1; the page of results to fetch.
+        - page_size (int): Set defaultly to 100; the number of articles on each page.
 
     Returns the covid articles gathered from the news API.
     '''
-    covid_articles = newsapi.get_everything(q=covid_terms,
-                                      from_param=twodaysago,
-                                      to=today,
-                                      language='en',
-                                      page=2)
+    if from_param is None:
+        from_param = (date.today() - timedelta(2)).strftime('%Y-%m-%d')
+    covid_articles = http_client.get_json(NEWS_API_URL,
+                                          params={'q': covid_terms,
+                                                  'from': from_param,
+                                                  'language': 'en',
+                                                  'sortBy': 'publishedAt',
+                                                  'page': page,
+                                                  'pageSize': page_size},
+                                          headers={'X-Api-Key': get_news_api_key()})
     return covid_articles
 
+def news_API_requests(covid_terms: str = "Covid COVID-19 coronavirus", from_param: str = None,
+                      max_pages: int = 3, page_size: int = 100, result_limit: int = None) -> list:
+    '''
+    Fetches the covid articles from every page of results.
+    The first page gives the number of results; the other pages are then fetched at the same time.
+    Only the pages within the plan's result limit are fetched, and if one of the other pages fails,
+    the articles from the rest are still returned.
+
+    Parameters:
+        - covid_terms (string): Set defaultly to "Covid COVID-19 coronavirus"; the terms to search for.
+        - from_param (string): Set defaultly to None; passed on to news_API_request.
+        - max_pages (int): Set defaultly to 3; the most pages fetched.
+        - page_size (int): Set defaultly to 100; the number of articles on each page.
+        - result_limit (int): Set defaultly to None; the most results the plan gives (0 for no limit).
+          If None, the 'news result limit' from the config file is used.
+
+    Returns a list of the articles.
+    '''
+    if result_limit is None:
+        result_limit = get_news_result_limit()
+    first_page = news_API_request(covid_terms, from_param, 1, page_size)
+    articles = list(first_page.get('articles', []))
+    results = first_page.get('totalResults', 0)
+    if result_limit:
+        results = min(results, result_limit)
+    pages = min(max_pages, math.ceil(results / page_size))
+    def other_page(page):
+        try:
+            return news_API_request(covid_terms, from_param, page, page_size)
+        except requests.RequestException:
+            logging.warning('News API: page %s could not be fetched.', page)
+            return {}
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=pages - 1) as executor:
+            for response in executor.map(other_page, range(2, pages + 1)):
+                articles.extend(response.get('articles', []))
+    return articles
+
+@timed('update_news')
 def update_news(update_name: str = "temp variable"):
     '''
     Updates the covid news.
+    Only articles published since the newest article in the article store are fetched,
+    and the new ones are added to the store.
 
     Parameters:
         - update_name (string): Takes the update name.
 
     Returns the update name.
     '''
-    articles = news_API_request()
-    with open('covid_articles.json', 'w', encoding="utf8") as json_file:
-        json.dump(articles, json_file)
-    df = pd.json_normalize(articles, "articles", errors="ignore")
-    df.to_csv('covid_articles.csv', index = False)
+    started = perf_counter()
+    store = get_article_store()
+    latest = store.latest_published()
+    new_articles = store.merge(news_API_requests(from_param=latest[:19] if latest else None))
+    logging.info('%s: %s new articles fetched.', update_name, len(new_articles),
+                 extra={'update': update_name, 'duration': perf_counter() - started})
+    #Only the first articles are logged, so that a large fetch does not flood the log file.
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        for article in new_articles[:ARTICLES_LOGGED]:
+            logging.debug('%s: Article fetched: %s', update_name, article.get('title'), extra={'update': update_name})
     return update_name
+
+async def news_API_requests_async(covid_terms: str = "Covid COVID-19 coronavirus", from_param: str = None,
+                                  max_pages: int = 3, page_size: int = 100, result_limit: int = None) -> list:
+    '''
+    Async variant of news_API_requests. The requests run in worker threads,
+    so the event loop is not blocked while waiting for the news API.
+    The parameters are those of news_API_requests.
+    '''
+    return await asyncio.to_thread(news_API_requests, covid_terms, from_param, max_pages, page_size, result_limit)
+
+async def update_news_async(update_name: str = "temp variable"):
+    '''
+    Async variant of update_news. The update runs in a worker thread,
+    so the event loop is not blocked while waiting for the news API or the article files.
+
+    Parameters:
+        - update_name (string): Takes the update name.
+
+    Returns the update name.
+    '''
+    return await asyncio.to_thread(update_news, update_name)
@@ -0,0 +1,188 @@
+'''
+Module name: covid_store.py
+
+Description:
+    - Module containing the SQLite store of the covid history of every area fetched.
+    - Rows are keyed by (areaCode, date), and each fetch only writes the days which are new or have changed.
+    - The last 7 days' cases, current hospital cases and total deaths come from indexed queries,
+      so no file has to be loaded to get them.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import sqlite3
+from threading import Lock
+
+#The metrics fetched from the covid API, shared by every module which stores or reads them.
+METRICS = ('newCasesBySpecimenDate', 'hospitalCases', 'cumDailyNsoDeathsByDeathDate')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS covid_history (
+    areaCode TEXT NOT NULL,
+    areaName TEXT,
+    areaType TEXT,
+    date TEXT NOT NULL,
+    newCasesBySpecimenDate INTEGER,
+    hospitalCases INTEGER,
+    cumDailyNsoDeathsByDeathDate INTEGER,
+    PRIMARY KEY (areaCode, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS covid_history_area_name ON covid_history (areaName, date);
+CREATE TABLE IF NOT EXISTS covid_meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+'''
+
+UPSERT = '''
+INSERT INTO covid_history VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (areaCode, date) DO UPDATE SET
+    areaName = excluded.areaName,
+    areaType = excluded.areaType,
+    newCasesBySpecimenDate = excluded.newCasesBySpecimenDate,
+    hospitalCases = excluded.hospitalCases,
+    cumDailyNsoDeathsByDeathDate = excluded.cumDailyNsoDeathsByDeathDate
+WHERE excluded.newCasesBySpecimenDate IS NOT covid_history.newCasesBySpecimenDate
+    OR excluded.hospitalCases IS NOT covid_history.hospitalCases
+    OR excluded.cumDailyNsoDeathsByDeathDate IS NOT covid_history.cumDailyNsoDeathsByDeathDate
+    OR excluded.areaName IS NOT covid_history.areaName
+'''
+
+def _iso_date(date: str) -> str:
+    '''
+    Converts a date to the year-month-day format, so that dates sort in order.
+
+    Parameters:
+        - date (string): The date, either as 'YYYY-MM-DD' (covid API) or 'DD/MM/YYYY' (older csv files).
+    '''
+    if '/' in date:
+        day, month, year = date.split('/')
+        return year + '-' + month + '-' + day
+    return date
+
+def metric_number(value):
+    '''
+    Converts a metric value to an integer, or None if there is no value.
+
+    Parameters:
+        - value: The value, from the covid API or a csv file.
+    '''
+    if value is None or value == '':
+        return None
+    return int(float(value))
+
+class CovidStore:
+    '''
+    Stores the covid history of many areas in one SQLite file.
+
+    Parameters:
+        - filename (string): Defaultly set to 'covid_history.sqlite3'; the database file.
+    '''
+    def __init__(self, filename: str = 'covid_history.sqlite3'):
+        self.filename = filename
+        self._lock = Lock()
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+
+    def upsert(self, rows: list) -> int:
+        '''
+        Adds the days which are not stored yet and updates the days whose values have changed.
+
+        Parameters:
+            - rows (list): The rows of a covid API response (or of parse_csv_data).
+
+        Returns the number of days added or changed.
+        '''
+        values = [(row['areaCode'], row.get('areaName'), row.get('areaType'), _iso_date(row['date']),
+                   *(metric_number(row.get(metric)) for metric in METRICS))
+                  for row in rows if row.get('areaCode') and row.get('date') not in (None, '', 'date')]
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(UPSERT, values)
+            changes = self._connection.total_changes - before
+            if changes:
+                self._connection.execute("INSERT INTO covid_meta VALUES ('version', 1) "
+                                         "ON CONFLICT (name) DO UPDATE SET value = value + 1")
+            return changes
+
+    def version(self) -> int:
+        '''
+        Gets the version of the stored data, which increases whenever an upsert changes any day.
+        Other processes using the same file see the same version.
+        '''
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM covid_meta WHERE name = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def latest_metrics(self, area_name: str):
+        '''
+        Gets the last 7 days' cases, current hospital cases and total deaths of an area,
+        with the same rules as process_covid_csv_data.
+
+        Parameters:
+            - area_name (string): The name of the area.
+
+        Returns the covid updates, or None if the area is not stored.
+        '''
+        with self._lock:
+            if not self._has_area(area_name):
+                return None
+            latest = {}
+            for metric in METRICS:
+                latest[metric] = self._connection.execute(
+                    'SELECT date, ' + metric + ' FROM covid_history WHERE areaName = ? AND ' + metric +
+                    ' IS NOT NULL ORDER BY date DESC LIMIT 1', (area_name,)).fetchone()
+            last7days_cases = 0
+            if latest['newCasesBySpecimenDate'] is not None:
+                #The latest day with cases is incomplete, so the 7 days before it are summed.
+                last7days_cases = self._connection.execute(
+                    'SELECT COALESCE(SUM(newCasesBySpecimenDate), 0) FROM (SELECT newCasesBySpecimenDate'
+                    ' FROM covid_history WHERE areaName = ? AND date < ? ORDER BY date DESC LIMIT 7)',
+                    (area_name, latest['newCasesBySpecimenDate'][0])).fetchone()[0]
+        return {'last7': last7days_cases,
+                'hospital_current': latest['hospitalCases'][1] if latest['hospitalCases'] else 0,
+                'deaths': latest['cumDailyNsoDeathsByDeathDate'][1] if latest['cumDailyNsoDeathsByDeathDate'] else 0}
+
+    def history(self, area_name: str, start: str = None, end: str = None) -> list:
+        '''
+        Gets the stored days of an area, oldest first.
+
+        Parameters:
+            - area_name (string): The name of the area.
+            - start (string): Defaultly set to None; the first date to include, as 'YYYY-MM-DD'.
+            - end (string): Defaultly set to None; the last date to include, as 'YYYY-MM-DD'.
+
+        Returns a list of (date, cases, hospital cases, total deaths) tuples.
+        '''
+        with self._lock:
+            return self._connection.execute(
+                'SELECT date, ' + ', '.join(METRICS) + ' FROM covid_history WHERE areaName = ?'
+                ' AND date >= ? AND date <= ? ORDER BY date',
+                (area_name, start or '', end or '9999-99-99')).fetchall()
+
+    def areas(self) -> list:
+        '''
+        Gets the names of the stored areas.
+        '''
+        with self._lock:
+            return [row[0] for row in self._connection.execute(
+                'SELECT DISTINCT areaName FROM covid_history ORDER BY areaName')]
+
+    def close(self):
+        '''
+        Closes the database file.
+        '''
+        with self._lock:
+            self._connection.close()
+
+    def _has_area(self, area_name: str) -> bool:
+        '''
+        Checks whether an area has any stored days.
+
+        Parameters:
+            - area_name (string): The name of the area.
+        '''
+        return self._connection.execute('SELECT 1 FROM covid_history WHERE areaName = ? LIMIT 1',
+                                        (area_name,)).fetchone() is not None
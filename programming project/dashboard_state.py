@@ -0,0 +1,83 @@
+'''
+Module name: dashboard_state.py
+
+Description:
+    - Module containing the dashboard state as one immutable snapshot.
+    - Fetchers and request handlers never change a snapshot: they build a new one from the current one
+      and swap it in with a single assignment, so a request always sees one whole version of the data.
+    - Reading the current snapshot takes no lock; only the writers are serialised.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+from collections import namedtuple
+from threading import Lock
+from types import MappingProxyType
+
+DashboardState = namedtuple('DashboardState', [
+    'version',             #Increased by every change, for the page cache.
+    'area_updates',        #The covid updates of each area, keyed by area name.
+    'local_infections',
+    'national_infections',
+    'hospital_cases',
+    'deaths',
+    'articles',            #The news articles, keyed by title, in the order they are shown.
+    'updates',             #The update widgets, keyed by title, in the order they were scheduled.
+    'deleted_titles'])     #The titles of dismissed articles, which are not shown again.
+
+def frozen(mapping) -> MappingProxyType:
+    '''
+    Copies a dictionary into a read-only view, so that a snapshot cannot be changed through it.
+
+    Parameters:
+        - mapping (dictionary): The dictionary to copy.
+    '''
+    return MappingProxyType(dict(mapping))
+
+EMPTY_STATE = DashboardState(version=0, area_updates=frozen({}), local_infections='Loading...',
+                             national_infections='Loading...', hospital_cases='Loading hospital cases...',
+                             deaths='Loading total deaths...', articles=frozen({}), updates=frozen({}),
+                             deleted_titles=frozenset())
+
+class StateHolder:
+    '''
+    Holds the current dashboard snapshot.
+
+    Parameters:
+        - state (DashboardState): Defaultly set to EMPTY_STATE; the first snapshot.
+        - on_change: Defaultly set to None; a function called with every new snapshot, in order,
+          before the next change is made (used to push the changes to open pages).
+    '''
+    def __init__(self, state: DashboardState = EMPTY_STATE, on_change=None):
+        self.on_change = on_change
+        self._state = state
+        self._lock = Lock()
+
+    def get(self) -> DashboardState:
+        '''
+        Gets the current snapshot. It never changes, so it can be used for a whole request without locking.
+        '''
+        return self._state
+
+    def update(self, change, *arguments):
+        '''
+        Builds a new snapshot from the current one and swaps it in.
+
+        Parameters:
+            - change: A function taking the current snapshot (and the arguments) and returning the new snapshot,
+              or the same snapshot if nothing changes.
+            - arguments: Extra arguments for the function.
+
+        Returns the new snapshot, or None if nothing changed.
+        '''
+        with self._lock:
+            current = self._state
+            new_state = change(current, *arguments)
+            if new_state is current:
+                return None
+            new_state = new_state._replace(version=current.version + 1)
+            self._state = new_state
+            if self.on_change is not None:
+                self.on_change(new_state)
+            return new_state
@@ -0,0 +1,21 @@
+'''
+Module name: fetcher.py
+
+Description:
+    - Runs the fetcher process, for serving the dashboard from several web worker processes.
+    - Set 'shared state file' in the config file, then start this process once and the web workers as many times as needed, for example:
+        python fetcher.py
+        gunicorn --workers 4 app:app
+    - Only this process calls the covid and news APIs and runs the scheduled updates;
+      the web workers read what it publishes to the shared state file.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import app
+
+if __name__ == '__main__':
+    if app.shared_state is None:
+        raise SystemExit("Set 'shared state file' in config.json to run the fetcher.")
+    app.run_fetcher()
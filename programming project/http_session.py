@@ -0,0 +1,131 @@
+'''
+Module name: http_session.py
+
+Description:
+    - Module containing the HTTP client shared by the covid and news handlers.
+    - Connections are pooled and kept alive, every request has a timeout,
+      failed requests are retried with jittered exponential backoff,
+      and responses are revalidated with conditional requests so unchanged data is not downloaded again.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import logging
+import random
+import time
+from collections import OrderedDict
+from threading import Lock
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import registry, Counter
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+retries_made = registry.register(Counter('covid_dashboard_http_retries_total',
+                                         'Requests to the APIs which were retried.', ('host',)))
+
+class HTTPClient:
+    '''
+    Makes GET requests for JSON through a pooled session.
+
+    Parameters:
+        - timeout (tuple): Defaultly set to (3.05, 30); the seconds to wait to connect and to read.
+        - retries (int): Defaultly set to 3; how many times a failed request is retried.
+        - backoff (float): Defaultly set to 0.5; the longest wait, in seconds, before the first retry. It doubles for each retry.
+        - max_backoff (float): Defaultly set to 30; the longest wait before any retry.
+        - pool_size (int): Defaultly set to 10; the number of connections kept alive to each host.
+        - cache_size (int): Defaultly set to 64; the number of responses kept for conditional requests.
+    '''
+    def __init__(self, timeout: tuple = (3.05, 30), retries: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 30, pool_size: int = 10, cache_size: int = 64):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache_size = cache_size
+        self.not_modified = 0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def get_json(self, url: str, params: dict = None, headers: dict = None):
+        '''
+        Gets a JSON response, sending the ETag and Last-Modified of the last response to the same request.
+        If the server answers '304 Not Modified', the last response is used again.
+
+        Parameters:
+            - url (string): The URL to request.
+            - params (dictionary): Defaultly set to None; the query parameters.
+            - headers (dictionary): Defaultly set to None; extra request headers.
+
+        Returns the parsed JSON, or None if the server has no content.
+        '''
+        key = requests.Request('GET', url, params=params).prepare().url
+        with self._lock:
+            cached = self._cache.get(key)
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached['etag']:
+                request_headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                request_headers['If-Modified-Since'] = cached['last_modified']
+        response = self._get(url, params, request_headers)
+        if response.status_code == 304 and cached is not None:
+            self.not_modified += 1
+            with self._lock:
+                self._cache.move_to_end(key)
+            return cached['body']
+        response.raise_for_status()
+        if response.status_code == 204:
+            return None
+        body = response.json()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            with self._lock:
+                self._cache[key] = {'etag': etag, 'last_modified': last_modified, 'body': body}
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return body
+
+    def _get(self, url: str, params: dict, headers: dict):
+        '''
+        Makes a GET request, retrying connection errors, timeouts and temporary server errors.
+
+        Parameters:
+            - url (string): The URL to request.
+            - params (dictionary): The query parameters.
+            - headers (dictionary): The request headers.
+
+        Returns the response.
+        '''
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                logging.warning('%s: Request failed; retrying.', url)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                logging.warning('%s: Status %s; retrying.', url, response.status_code)
+            retries_made.inc(host=urlparse(url).hostname)
+            time.sleep(self._delay(attempt))
+
+    def _delay(self, attempt: int) -> float:
+        '''
+        Gets a random wait before a retry, up to a limit which doubles with each attempt ("full jitter").
+
+        Parameters:
+            - attempt (int): The number of the attempt which failed, starting at 0.
+        '''
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+http_client = HTTPClient()
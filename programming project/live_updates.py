@@ -0,0 +1,175 @@
+'''
+Module name: live_updates.py
+
+Description:
+    - Module containing the broadcaster which pushes dashboard changes to open pages with Server-Sent Events.
+    - Only the values which changed since the last push are sent, so an open page never has to reload.
+    - Streams can be read by a thread (stream) or by an asyncio task (stream_async), which holds no thread while it waits.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import asyncio
+import json
+import queue
+from threading import Lock
+
+class LoopQueue:
+    '''
+    A subscriber queue read by an asyncio task. Messages may be put on it from any thread.
+
+    Parameters:
+        - loop: The event loop of the task reading the queue.
+    '''
+    def __init__(self, loop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+    def qsize(self) -> int:
+        '''
+        Gets the number of messages waiting.
+        '''
+        return self._queue.qsize()
+
+    def put_nowait(self, message):
+        '''
+        Puts a message on the queue from any thread. Messages for a closed event loop are dropped.
+
+        Parameters:
+            - message: The message, or None to end the stream.
+        '''
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+        except RuntimeError:
+            pass
+
+    async def get(self, timeout: float):
+        '''
+        Waits for the next message.
+
+        Parameters:
+            - timeout (float): The number of seconds to wait before raising asyncio.TimeoutError.
+        '''
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+class LiveUpdates:
+    '''
+    Keeps the latest dashboard values and sends the changed ones to every subscriber.
+
+    Parameters:
+        - backlog (int): Defaultly set to 100; the number of messages a slow subscriber can fall behind before it is dropped.
+        - heartbeat (float): Defaultly set to 15; the number of seconds between keep-alive comments on an idle stream.
+    '''
+    def __init__(self, backlog: int = 100, heartbeat: float = 15):
+        self.backlog = backlog
+        self.heartbeat = heartbeat
+        self.messages_sent = 0
+        self._lock = Lock()
+        self._values = {}
+        self._subscribers = set()
+
+    def publish(self, values: dict) -> dict:
+        '''
+        Sends the values which have changed to every subscriber.
+
+        Parameters:
+            - values (dictionary): The current dashboard values, keyed by the template variable names.
+
+        Returns the changed values.
+        '''
+        with self._lock:
+            changes = {name: value for name, value in values.items() if self._values.get(name) != value}
+            if not changes:
+                return changes
+            self._values.update(changes)
+            message = self._message(changes)
+            for subscriber in list(self._subscribers):
+                if subscriber.qsize() >= self.backlog:
+                    #The page is not reading its stream, so it is dropped and will reconnect.
+                    self._subscribers.discard(subscriber)
+                    subscriber.put_nowait(None)
+                    continue
+                subscriber.put_nowait(message)
+                self.messages_sent += 1
+        return changes
+
+    def subscribe(self, subscriber=None):
+        '''
+        Adds a subscriber, starting it off with all the current values.
+
+        Parameters:
+            - subscriber: Defaultly set to None; the message queue to use (such as a LoopQueue). If None, a new queue.Queue is used.
+
+        Returns the subscriber's message queue.
+        '''
+        if subscriber is None:
+            subscriber = queue.Queue()
+        with self._lock:
+            if self._values:
+                subscriber.put_nowait(self._message(self._values))
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        '''
+        Removes a subscriber.
+
+        Parameters:
+            - subscriber (Queue): The subscriber's message queue.
+        '''
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stream(self):
+        '''
+        Subscribes and yields the Server-Sent Events stream until the subscriber is dropped or the client disconnects.
+        '''
+        subscriber = self.subscribe()
+        try:
+            while True:
+                try:
+                    message = subscriber.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def stream_async(self):
+        '''
+        Subscribes and yields the Server-Sent Events stream, like stream, without holding a thread while it waits.
+        '''
+        subscriber = self.subscribe(LoopQueue(asyncio.get_running_loop()))
+        try:
+            while True:
+                try:
+                    message = await subscriber.get(self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def __len__(self) -> int:
+        '''
+        Gets the number of subscribers.
+        '''
+        with self._lock:
+            return len(self._subscribers)
+
+    @staticmethod
+    def _message(values: dict) -> str:
+        '''
+        Formats values as a Server-Sent Event.
+
+        Parameters:
+            - values (dictionary): The values to send.
+        '''
+        return 'event: update\ndata: ' + json.dumps(values, default=str) + '\n\n'
@@ -0,0 +1,247 @@
+'''
+Module name: metrics.py
+
+Description:
+    - Module containing the counters and timing histograms of the dashboard, shown in the Prometheus text format on '/metrics'.
+    - Timing spans ('with span(name):' or '@timed(name)') record how long each step takes,
+      such as the covid API call, writing the snapshot files or rendering the page.
+    - Values which other modules already count (such as the coalescer's saved calls) are read when '/metrics' is requested.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+
+#Upper bounds, in seconds, of the histogram buckets: from 1 ms to 30 s.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+    '''
+    Formats the labels of a sample, such as '{span="render"}'.
+
+    Parameters:
+        - names (tuple): The label names.
+        - values (tuple): The label values.
+        - extra (string): Defaultly set to ''; an already formatted label to add, such as 'le="0.5"'.
+    '''
+    pairs = [name + '="' + str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value: float) -> str:
+    '''
+    Formats a sample value.
+
+    Parameters:
+        - value (float): The value.
+    '''
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    '''
+    Counts events, separately for each combination of label values.
+
+    Parameters:
+        - name (string): The metric name, ending in '_total'.
+        - description (string): The help text.
+        - labelnames (tuple): Defaultly set to (); the label names.
+    '''
+    def __init__(self, name: str, description: str, labelnames: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        '''
+        Adds to the count.
+
+        Parameters:
+            - amount (float): Defaultly set to 1; how much to add.
+            - labels: The label values.
+        '''
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        '''
+        Gets the count for some label values.
+
+        Parameters:
+            - labels: The label values.
+        '''
+        with self._lock:
+            return self._values.get(tuple(labels[name] for name in self.labelnames), 0)
+
+    def render(self) -> list:
+        '''
+        Gets the lines of the metric in the Prometheus text format.
+        '''
+        with self._lock:
+            values = sorted(self._values.items())
+        return ['# HELP ' + self.name + ' ' + self.description, '# TYPE ' + self.name + ' counter'] + \
+               [self.name + _labels(self.labelnames, key) + ' ' + _number(value) for key, value in values]
+
+class Histogram:
+    '''
+    Counts observations (such as durations in seconds) in buckets, separately for each combination of label values.
+
+    Parameters:
+        - name (string): The metric name.
+        - description (string): The help text.
+        - labelnames (tuple): Defaultly set to (); the label names.
+        - buckets (tuple): Defaultly set to LATENCY_BUCKETS; the upper bounds of the buckets, in increasing order.
+    '''
+    def __init__(self, name: str, description: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels):
+        '''
+        Adds an observation.
+
+        Parameters:
+            - value (float): The observed value.
+            - labels: The label values.
+        '''
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                #One count per bucket, then the sum and the number of observations.
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def count(self, **labels) -> int:
+        '''
+        Gets the number of observations for some label values.
+
+        Parameters:
+            - labels: The label values.
+        '''
+        with self._lock:
+            counts = self._values.get(tuple(labels[name] for name in self.labelnames))
+            return counts[-1] if counts else 0
+
+    def render(self) -> list:
+        '''
+        Gets the lines of the metric in the Prometheus text format. The bucket counts are cumulative.
+        '''
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        lines = ['# HELP ' + self.name + ' ' + self.description, '# TYPE ' + self.name + ' histogram']
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(self.name + '_bucket' + _labels(self.labelnames, key, 'le="' + _number(bound) + '"') +
+                             ' ' + str(cumulative))
+            lines.append(self.name + '_bucket' + _labels(self.labelnames, key, 'le="+Inf"') + ' ' + str(counts[-1]))
+            lines.append(self.name + '_sum' + _labels(self.labelnames, key) + ' ' + _number(counts[-2]))
+            lines.append(self.name + '_count' + _labels(self.labelnames, key) + ' ' + str(counts[-1]))
+        return lines
+
+class Collected:
+    '''
+    A metric whose values are read from elsewhere when it is rendered.
+
+    Parameters:
+        - name (string): The metric name.
+        - description (string): The help text.
+        - metric_type (string): 'counter' or 'gauge'.
+        - labelnames (tuple): The label names.
+        - collect: A function returning a dictionary of values keyed by tuples of label values.
+    '''
+    def __init__(self, name: str, description: str, metric_type: str, labelnames: tuple, collect):
+        self.name = name
+        self.description = description
+        self.metric_type = metric_type
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def render(self) -> list:
+        '''
+        Gets the lines of the metric in the Prometheus text format.
+        '''
+        return ['# HELP ' + self.name + ' ' + self.description, '# TYPE ' + self.name + ' ' + self.metric_type] + \
+               [self.name + _labels(self.labelnames, key) + ' ' + _number(value)
+                for key, value in sorted(self.collect().items())]
+
+class Registry:
+    '''
+    Holds the metrics shown on '/metrics'.
+    '''
+    def __init__(self):
+        self._metrics = {}
+        self._lock = Lock()
+
+    def register(self, metric):
+        '''
+        Adds a metric, replacing any metric with the same name.
+
+        Parameters:
+            - metric: The Counter, Histogram or Collected metric.
+
+        Returns the metric.
+        '''
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        '''
+        Gets every metric in the Prometheus text format.
+        '''
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+registry = Registry()
+spans = registry.register(Histogram('covid_dashboard_span_seconds',
+                                    'Time taken by each step of the dashboard, in seconds.', ('span',)))
+
+@contextmanager
+def span(name: str):
+    '''
+    Times the code in a 'with' block, adding the time to the span histogram.
+
+    Parameters:
+        - name (string): The name of the step, used as the 'span' label.
+    '''
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        spans.observe(perf_counter() - started, span=name)
+
+def timed(name: str):
+    '''
+    Times every call of the decorated function, adding the time to the span histogram.
+
+    Parameters:
+        - name (string): The name of the step, used as the 'span' label.
+    '''
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
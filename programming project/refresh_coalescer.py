@@ -0,0 +1,88 @@
+'''
+Module name: refresh_coalescer.py
+
+Description:
+    - Module containing the coalescer which stops several scheduled updates from fetching the same data at once.
+    - While a refresh of a kind ('covid' or 'news') is running, later refreshes of that kind wait for its result.
+    - A refresh which finished within the freshness window is reused instead of calling the API again.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import logging
+import time
+from concurrent.futures import Future
+from threading import Lock
+
+class RefreshCoalescer:
+    '''
+    Runs one refresh of each kind at a time and shares its result.
+
+    Parameters:
+        - freshness (float): Defaultly set to 60; the number of seconds a finished refresh is reused for.
+    '''
+    def __init__(self, freshness: float = 60):
+        self.freshness = freshness
+        self.upstream_calls = {}
+        self.calls_saved = {}
+        self._lock = Lock()
+        self._running = {}
+        self._finished = {}
+
+    def run(self, kind: str, function):
+        '''
+        Runs a refresh, unless one of the same kind is running or has just finished.
+
+        Parameters:
+            - kind (string): The kind of refresh, such as 'covid' or 'news'.
+            - function: The function which calls the API.
+
+        Returns the result of the refresh.
+        '''
+        with self._lock:
+            finished = self._finished.get(kind)
+            if finished is not None and time.monotonic() - finished[0] < self.freshness:
+                self._save(kind)
+                return finished[1]
+            flight = self._running.get(kind)
+            leader = flight is None
+            if leader:
+                flight = self._running[kind] = Future()
+                self.upstream_calls[kind] = self.upstream_calls.get(kind, 0) + 1
+            else:
+                self._save(kind)
+        if not leader:
+            return flight.result()
+        try:
+            result = function()
+        except BaseException as error:
+            flight.set_exception(error)
+            raise
+        else:
+            flight.set_result(result)
+            with self._lock:
+                self._finished[kind] = (time.monotonic(), result)
+            return result
+        finally:
+            with self._lock:
+                del self._running[kind]
+
+    def _save(self, kind: str):
+        '''
+        Counts a refresh which did not need to call the API.
+
+        Parameters:
+            - kind (string): The kind of refresh.
+        '''
+        self.calls_saved[kind] = self.calls_saved.get(kind, 0) + 1
+        logging.info('%s: Refresh coalesced; %s upstream calls saved.', kind, self.calls_saved[kind])
+
+    def stats(self) -> dict:
+        '''
+        Gets the number of upstream calls made and saved for each kind of refresh.
+        '''
+        with self._lock:
+            return {kind: {'upstream_calls': self.upstream_calls.get(kind, 0),
+                           'calls_saved': self.calls_saved.get(kind, 0)}
+                    for kind in sorted(set(self.upstream_calls) | set(self.calls_saved))}
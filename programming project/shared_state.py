@@ -0,0 +1,123 @@
+'''
+Module name: shared_state.py
+
+Description:
+    - Module containing the dashboard state shared between processes through one SQLite file.
+    - A single fetcher process (fetcher.py) publishes the dashboard values and runs the scheduled updates.
+    - Any number of web worker processes read the values, and send the changes users make
+      (scheduling or cancelling updates and dismissing articles) to the fetcher as commands.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import json
+import sqlite3
+from threading import Lock
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS dashboard_state (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dashboard_commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    action TEXT NOT NULL,
+    arguments TEXT NOT NULL
+);
+'''
+
+class SharedState:
+    '''
+    Publishes and reads the dashboard values, and passes commands from the web workers to the fetcher.
+    Every publish increases a version number, so readers can cheaply check whether anything changed.
+
+    Parameters:
+        - filename (string): Defaultly set to 'dashboard_state.sqlite3'; the database file shared by the processes.
+    '''
+    def __init__(self, filename: str = 'dashboard_state.sqlite3'):
+        self.filename = filename
+        self._lock = Lock()
+        self._connection = sqlite3.connect(filename, timeout=10, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+
+    def publish(self, values: dict) -> int:
+        '''
+        Replaces the published values in one transaction.
+
+        Parameters:
+            - values (dictionary): The dashboard values, which must be JSON serialisable.
+
+        Returns the new version number.
+        '''
+        rows = [(name, json.dumps(value)) for name, value in values.items()]
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN IMMEDIATE')
+            version = self._version() + 1
+            self._connection.executemany('INSERT OR REPLACE INTO dashboard_state VALUES (?, ?)',
+                                         rows + [('version', str(version))])
+        return version
+
+    def read(self, since: int = None):
+        '''
+        Reads the published values, unless they have not changed.
+
+        Parameters:
+            - since (int): Defaultly set to None; the version number the reader already has.
+
+        Returns the version number and the values, or None if the version is still 'since'.
+        '''
+        with self._lock:
+            if since is not None and self._version() == since:
+                return None
+            #One query reads a consistent copy of every value, even while the fetcher publishes.
+            values = {name: json.loads(value) for name, value in
+                      self._connection.execute('SELECT name, value FROM dashboard_state')}
+        return values.pop('version', 0), values
+
+    def version(self) -> int:
+        '''
+        Gets the version number of the published values, 0 if nothing has been published.
+        '''
+        with self._lock:
+            return self._version()
+
+    def send(self, action: str, *arguments):
+        '''
+        Sends a command to the fetcher.
+
+        Parameters:
+            - action (string): The name of the command.
+            - arguments: The arguments of the command, which must be JSON serialisable.
+        '''
+        with self._lock, self._connection:
+            self._connection.execute('INSERT INTO dashboard_commands (action, arguments) VALUES (?, ?)',
+                                     (action, json.dumps(arguments)))
+
+    def receive(self) -> list:
+        '''
+        Takes the commands waiting for the fetcher, oldest first.
+
+        Returns a list of (action, arguments) tuples.
+        '''
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN IMMEDIATE')
+            rows = self._connection.execute('SELECT id, action, arguments FROM dashboard_commands ORDER BY id').fetchall()
+            if rows:
+                self._connection.execute('DELETE FROM dashboard_commands WHERE id <= ?', (rows[-1][0],))
+        return [(action, json.loads(arguments)) for command_id, action, arguments in rows]
+
+    def close(self):
+        '''
+        Closes the database file.
+        '''
+        with self._lock:
+            self._connection.close()
+
+    def _version(self) -> int:
+        '''
+        Reads the version number. The lock must be held.
+        '''
+        row = self._connection.execute("SELECT value FROM dashboard_state WHERE name = 'version'").fetchone()
+        return int(row[0]) if row else 0
@@ -0,0 +1,178 @@
+'''
+Module name: structured_logging.py
+
+Description:
+    - Module containing the logging set-up of the dashboard.
+    - Log calls only put the record on a queue; one background thread writes the records to the log file,
+      so logging never waits for the disk on a request or update thread.
+    - The log file is rotated by size (or by time), keeping a few old files, and is added to rather than emptied on start.
+    - Records can carry the update name, area and duration (for example extra={'update': update_name, 'duration': 0.5}),
+      which are written as separate fields, either as text or as one JSON object per line.
+    - Records logged in loops (such as one per article fetched) are rate-limited, and the number left out is logged.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from collections import OrderedDict
+from threading import Lock
+
+#The structured fields a record can carry, with 'extra='.
+FIELDS = ('update', 'area', 'duration')
+
+class StructuredFormatter(logging.Formatter):
+    '''
+    Formats a record with its structured fields.
+
+    Parameters:
+        - json_lines (boolean): Defaultly set to False; if True, each record is one JSON object,
+          otherwise a line of text like the old log file, followed by the fields as 'name=value'.
+    '''
+    def __init__(self, json_lines: bool = False):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        self.json_lines = json_lines
+
+    @staticmethod
+    def fields(record: logging.LogRecord) -> dict:
+        '''
+        Gets the structured fields of a record, and the number of similar records left out before it.
+
+        Parameters:
+            - record (LogRecord): The record.
+        '''
+        fields = {name: getattr(record, name) for name in FIELDS if getattr(record, name, None) is not None}
+        if 'duration' in fields:
+            fields['duration'] = round(fields['duration'], 3)
+        if getattr(record, 'suppressed', 0):
+            fields['suppressed'] = record.suppressed
+        return fields
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = self.fields(record)
+        if not self.json_lines:
+            text = super().format(record)
+            if fields:
+                text += ' [' + ' '.join(name + '=' + str(value) for name, value in fields.items()) + ']'
+            return text
+        entry = {'time': self.formatTime(record), 'logger': record.name, 'level': record.levelname,
+                 'message': record.getMessage(), **fields}
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class RateLimitFilter(logging.Filter):
+    '''
+    Lets through at most 'limit' records of each message in each interval, for records below WARNING.
+    Messages are told apart by their template (such as '%s: Update finished.'), so values should be passed as arguments.
+    The first record let through after some were left out carries their number as 'suppressed'.
+    Messages which have not been seen for an interval are forgotten, and at most 'max_messages' are remembered.
+
+    Parameters:
+        - limit (int): Defaultly set to 20; the number of records of one message let through in each interval.
+        - interval (float): Defaultly set to 60; the length of the interval, in seconds.
+        - max_messages (int): Defaultly set to 1000; the most messages remembered, dropping the least recently logged.
+    '''
+    def __init__(self, limit: int = 20, interval: float = 60, max_messages: int = 1000):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.max_messages = max_messages
+        #The start of the current interval, the records let through and the records left out, keyed by message,
+        #least recently logged first.
+        self._counts = OrderedDict()
+        self._swept = time.monotonic()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        '''
+        Gets the number of messages remembered.
+        '''
+        with self._lock:
+            return len(self._counts)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        key = (record.name, record.msg)
+        with self._lock:
+            if now - self._swept >= self.interval:
+                #Messages whose interval has ended are forgotten, unless some of their records were left out.
+                self._counts = OrderedDict((message, counts) for message, counts in self._counts.items()
+                                           if counts[2] or now - counts[0] < self.interval)
+                self._swept = now
+            started, passed, suppressed = self._counts.pop(key, (now, 0, 0))
+            if now - started >= self.interval:
+                started, passed = now, 0
+            allowed = passed < self.limit
+            self._counts[key] = (started, passed + 1, 0) if allowed else (started, passed, suppressed + 1)
+            if len(self._counts) > self.max_messages:
+                self._counts.popitem(last=False)
+        if not allowed:
+            return False
+        record.suppressed = suppressed
+        return True
+
+def stop_logging(listener: logging.handlers.QueueListener):
+    '''
+    Writes out the records left on the queue, then stops the listener and closes its log file.
+    Does nothing if the listener has already been stopped.
+
+    Parameters:
+        - listener (QueueListener): The listener returned by setup_logging.
+    '''
+    if listener._thread is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+def setup_logging(filename: str = 'sys.log', level: str = 'DEBUG', max_bytes: int = 5_000_000,
+                  backup_count: int = 5, when: str = None, json_lines: bool = False,
+                  rate_limit: int = 20, logger: logging.Logger = None):
+    '''
+    Sends the log records through a queue to a rotating log file, replacing any queue added by an earlier call.
+
+    Parameters:
+        - filename (string): Defaultly set to 'sys.log'; the log file.
+        - level (string): Defaultly set to 'DEBUG'; the lowest level logged.
+        - max_bytes (int): Defaultly set to 5,000,000; the size at which the file is rotated.
+        - backup_count (int): Defaultly set to 5; the number of old files kept ('sys.log.1' and so on).
+        - when (string): Defaultly set to None; if set (for example 'midnight' or 'H'), the file is rotated at that time instead of by size.
+        - json_lines (boolean): Defaultly set to False; if True, each record is written as one JSON object.
+        - rate_limit (int): Defaultly set to 20; the number of records of one message logged each minute, below WARNING. 0 logs them all.
+        - logger (Logger): Defaultly set to None; the logger to set up, or None for the root logger.
+
+    Returns the QueueListener writing the records. The records left on the queue are written out when the program exits.
+    '''
+    logger = logger or logging.getLogger()
+    #Only a queue added by an earlier call is replaced, so handlers added by others (such as pytest's) are kept.
+    #Its records are written out first, since they may rotate the file.
+    for handler in list(logger.handlers):
+        if getattr(handler, 'listener', None) is not None:
+            logger.removeHandler(handler)
+            stop_logging(handler.listener)
+    if when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(filename, when=when, backupCount=backup_count,
+                                                                 encoding='utf8')
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count,
+                                                            encoding='utf8')
+    file_handler.setFormatter(StructuredFormatter(json_lines))
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    if rate_limit:
+        queue_handler.addFilter(RateLimitFilter(rate_limit))
+    listener = logging.handlers.QueueListener(records, file_handler)
+    queue_handler.listener = listener
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    listener.start()
+    atexit.register(stop_logging, listener)
+    return listener
@@ -1,5 +1,10 @@
+import app as dashboard
 from app import get_news
 from app import schedule_update
+from app import app
+from app import index_articles
+from app import seconds_until
+from datetime import datetime
 
 def test_get_news():
     data = get_news()
@@ -8,3 +13,31 @@ def test_get_news():
 def test_schedule_update():
     data = get_news()
     assert isinstance(data, list)
+
+def test_index_served_before_warm_up():
+    response = app.test_client().get('/')
+    assert response.status_code == 200
+
+def test_index_not_modified():
+    client = app.test_client()
+    etag = client.get('/index').headers['ETag']
+    response = client.get('/index', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    client.get('/index?update=23%3A59&two=etag+test&news=news')
+    response = client.get('/index', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    client.get('/index?update_item=etag+test')
+
+def test_dismiss_article():
+    article = {'title': 'Dismissed article', 'content': 'Read more'}
+    dashboard.state.update(dashboard.with_articles, [article])
+    app.test_client().get('/index?notif=Dismissed+article')
+    assert 'Dismissed article' not in dashboard.state.get().articles
+    articles = index_articles([article, {'title': 'Kept article', 'content': ''}] * 2)
+    assert list(articles) == ['Kept article']
+
+def test_seconds_until():
+    assert seconds_until(23, 45, datetime(2021, 12, 31, 23, 30)) == 15*60 + 1
+    #Times already passed today are tomorrow, even at the end of a month or year.
+    assert seconds_until(0, 15, datetime(2021, 12, 31, 23, 30)) == 45*60 + 1
+    assert seconds_until(23, 30, datetime(2021, 12, 31, 23, 30, 5)) == 24*60*60 - 5 + 1
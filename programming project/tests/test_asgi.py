@@ -0,0 +1,55 @@
+import asyncio
+import asgi
+from live_updates import LiveUpdates
+
+def call(path, query=b'', headers=(), messages=({'type': 'http.disconnect'},), waiting=None):
+    async def run():
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+                 'scheme': 'http', 'query_string': query, 'headers': list(headers), 'server': ('127.0.0.1', 80),
+                 'client': ('127.0.0.1', 1234), 'http_version': '1.1', 'asgi': {'version': '3.0'}}
+        incoming = [{'type': 'http.request', 'body': b'', 'more_body': False}] + list(messages)
+        sent = []
+        async def receive():
+            if len(incoming) > 1:
+                return incoming.pop(0)
+            if waiting is not None:
+                waiting()
+            await asyncio.sleep(0.2)
+            return incoming[0]
+        async def send(message):
+            sent.append(message)
+        await asyncio.wait_for(asgi.application(scope, receive, send), 10)
+        return sent
+    sent = asyncio.run(run())
+    finished = sent[-1].get('more_body', False) is False
+    return sent[0]['status'], dict(sent[0]['headers']), b''.join(message.get('body', b'') for message in sent[1:]), finished
+
+def test_page():
+    status, headers, body, finished = call('/')
+    assert status == 200
+    assert finished
+    assert b'COVID API' in body
+    status, headers, body, finished = call('/index', headers=[(b'if-none-match', headers[b'etag'])])
+    assert status == 304
+    assert body == b''
+
+def test_other_requests_go_to_flask():
+    status, headers, body, finished = call('/metrics')
+    assert status == 200
+    assert b'covid_dashboard_requests_total{endpoint="index",status="200"}' in body
+
+def test_events_stop_when_page_closed():
+    status, headers, body, finished = call('/events')
+    assert status == 200
+    assert headers[b'content-type'].startswith(b'text/event-stream')
+    assert body.startswith(b'event: update\ndata: ')
+
+def test_events_end_when_subscriber_dropped(monkeypatch):
+    live = LiveUpdates(backlog=0)
+    live.publish({'deaths_total': '141544 total deaths'})
+    monkeypatch.setattr(asgi.dashboard, 'live', live)
+    #The page never disconnects; with no backlog allowed, the next change drops its stream.
+    status, headers, body, finished = call('/events', messages=(), waiting=lambda: live.publish({'deaths_total': '1'}))
+    assert status == 200
+    assert finished
+    assert len(live) == 0
@@ -0,0 +1,39 @@
+import numpy as np
+from covid_data_handler import parse_csv_data, series_metrics
+from binary_snapshot import covid_series, save_array, load_array
+from binary_snapshot import save_articles, load_articles
+
+def api_rows():
+    rows = []
+    for row in parse_csv_data('nation_2021-10-28.csv'):
+        if row['date'] == 'date':
+            continue
+        day, month, year = row['date'].split('/')
+        rows.append(dict(row, date=year + '-' + month + '-' + day))
+    return rows
+
+def test_series_metrics():
+    series = covid_series(api_rows())
+    assert len(series) == 638
+    assert series_metrics(series, 'England') == {'last7': 240_299, 'hospital_current': 7_019, 'deaths': 141_544}
+    assert series_metrics(series, 'Exeter') is None
+
+def test_save_and_load_array(tmp_path):
+    filename = str(tmp_path / 'covid.npy')
+    series = covid_series(api_rows())
+    save_array(filename, series)
+    loaded = load_array(filename)
+    assert isinstance(loaded, np.memmap)
+    assert loaded['date'][0] == np.datetime64('2021-10-28')
+    assert series_metrics(loaded, 'England') == series_metrics(series, 'England')
+    assert load_array(str(tmp_path / 'missing.npy')) is None
+
+def test_save_and_load_articles(tmp_path):
+    filename = str(tmp_path / 'articles.npy')
+    articles = [{'title': 'Article ' + str(number), 'content': 'Café ' * number} for number in range(3)]
+    save_articles(filename, articles)
+    loaded = load_articles(filename)
+    assert len(loaded) == 3
+    assert loaded[2] == articles[2]
+    assert loaded[-1] == articles[2]
+    assert list(loaded) == articles
@@ -0,0 +1,44 @@
+import app as dashboard
+from covid_data_handler import parse_csv_data
+from covid_store import CovidStore
+from covid_analytics import analytics_frame, analytics_page
+
+def fixture_history(tmp_path):
+    store = CovidStore(str(tmp_path / 'covid.sqlite3'))
+    store.upsert(parse_csv_data('nation_2021-10-28.csv'))
+    return store, store.history('England')
+
+def test_analytics_frame(tmp_path):
+    store, history = fixture_history(tmp_path)
+    analytics = analytics_frame(history, population=56_550_138)
+    latest = analytics.iloc[2]
+    assert latest['date'] == '2021-10-26'
+    #The same 7 days as the dashboard's 7-day infection rate.
+    assert latest['cases_7day_total'] == 240_299
+    assert latest['cases_7day_average'] == 34_328.4
+    assert latest['cases_7day_per_100k'] == 424.9
+    assert latest['week_on_week_change'] == -12.1
+    assert analytics.iloc[0]['hospital_cases'] == 7_019
+    assert analytics.iloc[0]['hospital_trend'] == 'rising'
+    assert len(analytics_frame([])) == 0
+
+def test_analytics_page(tmp_path):
+    store, history = fixture_history(tmp_path)
+    page = analytics_page(analytics_frame(history), start='2021-10-01', end='2021-10-28', page=2, page_size=10)
+    assert page['total'] == 28
+    assert page['pages'] == 3
+    assert [row['date'] for row in page['data']][:2] == ['2021-10-18', '2021-10-17']
+    assert page['data'][0]['cases_7day_per_100k'] is None
+
+def test_analytics_endpoint(tmp_path, monkeypatch):
+    store, history = fixture_history(tmp_path)
+    monkeypatch.setattr('covid_data_handler.covid_store', store)
+    client = dashboard.app.test_client()
+    response = client.get('/analytics?area=England&end=2021-10-26&page_size=1')
+    assert response.status_code == 200
+    assert response.json['data'][0]['cases_7day_total'] == 240_299
+    assert response.json['pages'] == 638 - 2
+    assert client.get('/analytics?area=England&end=2021-10-26&page_size=1',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get('/analytics?area=Nowhere').status_code == 404
+    assert client.get('/analytics?area=England&start=26/10/2021').status_code == 400
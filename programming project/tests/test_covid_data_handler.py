@@ -1,12 +1,33 @@
+import asyncio
+import time
+import pandas as pd
+import covid_data_handler
+from covid_data_handler import iter_csv_data
 from covid_data_handler import parse_csv_data
 from covid_data_handler import process_covid_csv_data
+from covid_data_handler import process_covid_json_data
+from covid_data_handler import covid_metrics_by_date
 from covid_data_handler import covid_API_request
-from covid_data_handler import schedule_covid_updates
+from covid_data_handler import covid_API_requests
+from covid_data_handler import covid_API_requests_batched
+from covid_data_handler import covid_API_request_async
+from covid_data_handler import process_covid_frame_by_area
 
 def test_parse_csv_data():
     data = parse_csv_data('nation_2021-10-28.csv')
     assert len(data) == 639
 
+def test_parse_csv_data_keeps_headings():
+    articles = parse_csv_data('covid_articles.csv')
+    assert 'source.id' in articles[0]
+    assert 'source.name' in articles[0]
+
+def test_iter_csv_data():
+    rows = list(iter_csv_data('nation_2021-10-28.csv'))
+    assert len(rows) == 638
+    assert rows[0].date == '28/10/2021'
+    assert rows[0].hospitalCases == '7019'
+
 def test_process_covid_csv_data():
     last7days_cases , current_hospital_cases , total_deaths = \
         process_covid_csv_data ( parse_csv_data (
@@ -15,10 +36,100 @@ def test_process_covid_csv_data():
     assert current_hospital_cases == 7_019
     assert total_deaths == 141_544
 
+def test_process_covid_csv_data_stops_early():
+    rows = iter_csv_data('nation_2021-10-28.csv')
+    assert process_covid_csv_data(rows) == (240_299, 7_019, 141_544)
+    assert next(rows).date == '14/10/2021'
+
 def test_covid_API_request():
     data = covid_API_request()
     assert isinstance(data, dict)
 
-def test_schedule_covid_updates():
-    schedule_covid_updates(update_interval=10, update_name='update test')
+def two_area_rows():
+    rows = []
+    for row in parse_csv_data('nation_2021-10-28.csv')[:-1]:
+        day, month, year = row['date'].split('/')
+        rows.append(dict(row, areaName='Exeter', areaType='ltla', date=year + '-' + month + '-' + day))
+    #Devon's data stops a week earlier, and the two areas' rows are mixed together.
+    devon = [dict(row, areaName='Devon') for row in rows[7:]]
+    return [row for pair in zip(rows, devon) for row in pair]
+
+def test_process_covid_frame_by_area():
+    updates = process_covid_frame_by_area(pd.DataFrame(two_area_rows()))
+    assert updates['Exeter'] == {'last7': 240_299, 'hospital_current': 7_019, 'deaths': 141_544}
+    assert updates['Devon'] == {'last7': 276_768, 'hospital_current': 6_366, 'deaths': 141_544}
+
+def test_covid_API_requests_batched(monkeypatch):
+    requests = []
+    def fake_get_covid_json(filters):
+        requests.append(filters)
+        return {'data': two_area_rows()}
+    monkeypatch.setattr(covid_data_handler, 'get_covid_json', fake_get_covid_json)
+    updates = covid_API_requests_batched([('Exeter', 'ltla'), ('Devon', 'ltla'), ('Nowhere', 'ltla')],
+                                         snapshot=False)
+    assert requests == [['areaType=ltla']]
+    assert list(updates) == ['Exeter', 'Devon']
+
+def test_covid_API_request_logs_area(monkeypatch, caplog):
+    rows = [row for row in two_area_rows() if row['areaName'] == 'Exeter']
+    monkeypatch.setattr(covid_data_handler, 'get_covid_json', lambda filters: {'data': rows})
+    with caplog.at_level('INFO'):
+        covid_API_request('Exeter', 'ltla', snapshot=False)
+    record = [record for record in caplog.records if record.getMessage() == 'Exeter: Covid data fetched.'][0]
+    assert record.area == 'Exeter'
+    assert record.duration >= 0
+
+def test_covid_API_requests(monkeypatch):
+    def slow_request(location, location_type, snapshot):
+        time.sleep(0.2)
+        return {'last7': len(location), 'hospital_current': 0, 'deaths': 0}
+    monkeypatch.setattr(covid_data_handler, 'covid_API_request', slow_request)
+    start = time.perf_counter()
+    updates = covid_API_requests([('Exeter', 'ltla'), ('England', 'nation'), ('Devon', 'utla')])
+    assert time.perf_counter() - start < 0.4
+    assert updates['Exeter']['last7'] == 6
+    assert list(updates) == ['Exeter', 'England', 'Devon']
+
+
+def test_process_covid_json_data():
+    metrics = ('cumDailyNsoDeathsByDeathDate', 'hospitalCases', 'newCasesBySpecimenDate')
+    rows = parse_csv_data('nation_2021-10-28.csv')[:-1]
+    data = {'data': [{key: (int(value) if value != '' else None) if key in metrics else value
+                      for key, value in row.items()} for row in rows]}
+    last7days_cases , current_hospital_cases , total_deaths = \
+        process_covid_json_data(data)
+    assert last7days_cases == 240_299
+    assert current_hospital_cases == 7_019
+    assert total_deaths == 141_544
+
+def test_covid_metrics_by_date():
+    metrics = covid_metrics_by_date(pd.DataFrame(
+        parse_csv_data('nation_2021-10-28.csv')[:-1]))
+    assert len(metrics) == 638
+    assert metrics.iloc[0].tolist() == ['28/10/2021', 240_299, 7_019, 141_544]
+    assert metrics.iloc[7].tolist() == ['21/10/2021', 276_768, 6_366, 141_544]
+
+def test_covid_API_request_async(monkeypatch):
+    def slow_request(location, location_type, snapshot):
+        time.sleep(0.2)
+        return {'last7': len(location), 'hospital_current': 0, 'deaths': 0}
+    monkeypatch.setattr(covid_data_handler, 'covid_API_request', slow_request)
+    async def request_all():
+        return await asyncio.gather(covid_API_request_async('Exeter', 'ltla'),
+                                    covid_API_request_async('England', 'nation'))
+    start = time.perf_counter()
+    updates = asyncio.run(request_all())
+    assert time.perf_counter() - start < 0.4
+    assert [update['last7'] for update in updates] == [6, 7]
 
+def test_write_snapshot_files(tmp_path, monkeypatch):
+    data = {'data': two_area_rows()}
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(covid_data_handler, 'text_snapshots', False)
+    covid_data_handler.write_snapshot_files(data, 'Exeter', 'ltla')
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['covid_updates_ltla_exeter.npy']
+    monkeypatch.setattr(covid_data_handler, 'text_snapshots', True)
+    covid_data_handler.write_snapshot_files(data, 'Exeter', 'ltla')
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['covid_updates_ltla_exeter.csv',
+                                                                'covid_updates_ltla_exeter.json',
+                                                                'covid_updates_ltla_exeter.npy']
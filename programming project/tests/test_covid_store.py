@@ -0,0 +1,35 @@
+from covid_data_handler import parse_csv_data
+from covid_store import CovidStore
+
+def test_latest_metrics(tmp_path):
+    store = CovidStore(str(tmp_path / 'covid.sqlite3'))
+    store.upsert(parse_csv_data('nation_2021-10-28.csv'))
+    assert store.latest_metrics('England') == {'last7': 240_299, 'hospital_current': 7_019, 'deaths': 141_544}
+    assert store.latest_metrics('Exeter') is None
+    assert store.areas() == ['England']
+
+def test_upsert_only_writes_changes(tmp_path):
+    store = CovidStore(str(tmp_path / 'covid.sqlite3'))
+    rows = parse_csv_data('nation_2021-10-28.csv')
+    assert store.upsert(rows) == 638
+    assert store.upsert(rows) == 0
+    changed = dict(rows[0], hospitalCases='7020')
+    assert store.upsert([changed]) == 1
+    assert store.latest_metrics('England')['hospital_current'] == 7_020
+
+def test_history(tmp_path):
+    store = CovidStore(str(tmp_path / 'covid.sqlite3'))
+    store.upsert(parse_csv_data('nation_2021-10-28.csv'))
+    history = store.history('England', start='2021-10-20', end='2021-10-28')
+    assert [day[0] for day in history] == ['2021-10-' + str(day) for day in range(20, 29)]
+    assert history[-1][2] == 7_019
+
+def test_version(tmp_path):
+    store = CovidStore(str(tmp_path / 'covid.sqlite3'))
+    assert store.version() == 0
+    rows = parse_csv_data('nation_2021-10-28.csv')
+    store.upsert(rows)
+    assert store.version() == 1
+    store.upsert(rows)
+    assert store.version() == 1
+    assert CovidStore(store.filename).version() == 1
@@ -0,0 +1,66 @@
+import re
+from threading import Thread
+import app as dashboard
+from dashboard_state import EMPTY_STATE, StateHolder
+
+def test_update_swaps_snapshot():
+    changes = []
+    holder = StateHolder(on_change=changes.append)
+    first = holder.get()
+    second = holder.update(lambda current: current._replace(local_infections=10))
+    assert second.version == 1
+    assert holder.get() is second
+    assert first.local_infections == 'Loading...'
+    assert holder.update(lambda current: current) is None
+    assert changes == [second]
+
+def test_snapshot_cannot_be_changed():
+    try:
+        EMPTY_STATE.articles['title'] = {}
+    except TypeError:
+        pass
+    else:
+        raise AssertionError('snapshot changed')
+
+def test_refreshes_and_requests_concurrently(monkeypatch):
+    monkeypatch.setattr(dashboard, 'state', StateHolder(on_change=dashboard.state_changed))
+    errors = []
+    pages = []
+    def refresh(worker):
+        try:
+            for number in range(200):
+                value = worker * 1000 + number
+                dashboard.show_covid_updates({dashboard.nation_location: {
+                    'last7': value, 'hospital_current': value, 'deaths': value}})
+                dashboard.state.update(dashboard.with_articles,
+                                       [{'title': 'Article ' + str(value), 'content': ''}])
+        except Exception as error:
+            errors.append(error)
+    def browse(worker):
+        client = dashboard.app.test_client()
+        try:
+            for number in range(50):
+                name = 'stress+' + str(worker) + '+' + str(number)
+                response = client.get('/index?update=23%3A59&two=' + name + '&news=news')
+                assert response.status_code == 200
+                pages.append(response.get_data(as_text=True))
+                client.get('/index?update_item=' + name)
+                client.get('/index?notif=Article+' + str(number))
+        except Exception as error:
+            errors.append(error)
+    threads = [Thread(target=refresh, args=(worker,)) for worker in range(2)]
+    threads += [Thread(target=browse, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    for page in pages:
+        #Every page shows the numbers of one refresh, never a mix of two.
+        national = re.search(r'id="national_7day_infections">([^<]*)<', page).group(1)
+        hospital = re.search(r'id="hospital_cases">([^<]*)<', page).group(1)
+        deaths = re.search(r'id="deaths_total">([^<]*)<', page).group(1)
+        if national != 'Loading...':
+            assert hospital == national + ' hospital cases'
+            assert deaths == national + ' total deaths'
+    assert not any(title.startswith('stress') for title in dashboard.state.get().updates)
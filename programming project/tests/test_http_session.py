@@ -0,0 +1,59 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+import pytest
+from http_session import HTTPClient
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+    failures_left = 0
+
+    def do_GET(self):
+        StubHandler.requests_seen.append((self.path, self.client_address[1], dict(self.headers)))
+        if self.path.startswith('/flaky') and StubHandler.failures_left > 0:
+            StubHandler.failures_left -= 1
+            self.reply(503, b'')
+        elif self.headers.get('If-None-Match') == '"v1"':
+            self.reply(304, b'')
+        else:
+            self.reply(200, json.dumps({'data': [1, 2, 3]}).encode(), {'ETag': '"v1"'})
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    StubHandler.requests_seen = []
+    yield 'http://127.0.0.1:' + str(server.server_port)
+    server.shutdown()
+
+def test_get_json_conditional(stub_url):
+    client = HTTPClient()
+    assert client.get_json(stub_url + '/data', params={'page': 1}) == {'data': [1, 2, 3]}
+    assert client.get_json(stub_url + '/data', params={'page': 1}) == {'data': [1, 2, 3]}
+    assert client.not_modified == 1
+    assert StubHandler.requests_seen[1][2]['If-None-Match'] == '"v1"'
+    #Both requests used the same kept-alive connection.
+    assert StubHandler.requests_seen[0][1] == StubHandler.requests_seen[1][1]
+
+def test_get_json_retries(stub_url):
+    client = HTTPClient(retries=2, backoff=0.01)
+    StubHandler.failures_left = 2
+    assert client.get_json(stub_url + '/flaky') == {'data': [1, 2, 3]}
+    assert len(StubHandler.requests_seen) == 3
+    StubHandler.failures_left = 3
+    with pytest.raises(Exception):
+        client.get_json(stub_url + '/flaky')
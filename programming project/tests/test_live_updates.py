@@ -0,0 +1,40 @@
+import asyncio
+import json
+from live_updates import LiveUpdates
+
+def read_values(message):
+    return json.loads(message.split('data: ', 1)[1])
+
+def test_publish_sends_only_changes():
+    live = LiveUpdates()
+    live.publish({'hospital_cases': '7019 hospital cases', 'deaths_total': '141544 total deaths'})
+    subscriber = live.subscribe()
+    assert read_values(subscriber.get_nowait()) == {'hospital_cases': '7019 hospital cases',
+                                                    'deaths_total': '141544 total deaths'}
+    assert live.publish({'hospital_cases': '7019 hospital cases', 'deaths_total': '141545 total deaths'}) \
+        == {'deaths_total': '141545 total deaths'}
+    assert read_values(subscriber.get_nowait()) == {'deaths_total': '141545 total deaths'}
+    assert live.publish({'deaths_total': '141545 total deaths'}) == {}
+    assert subscriber.empty()
+
+def test_slow_subscriber_dropped():
+    live = LiveUpdates(backlog=2)
+    live.subscribe()
+    for i in range(3):
+        live.publish({'local_7day_infections': i})
+    assert len(live) == 0
+
+def test_stream_async():
+    live = LiveUpdates()
+    live.publish({'deaths_total': '141544 total deaths'})
+    async def read_two():
+        stream = live.stream_async()
+        first = await stream.__anext__()
+        live.publish({'deaths_total': '141545 total deaths'})
+        second = await stream.__anext__()
+        await stream.aclose()
+        return first, second
+    first, second = asyncio.run(read_two())
+    assert read_values(first) == {'deaths_total': '141544 total deaths'}
+    assert read_values(second) == {'deaths_total': '141545 total deaths'}
+    assert len(live) == 0
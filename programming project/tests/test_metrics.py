@@ -0,0 +1,49 @@
+import time
+import app as dashboard
+from metrics import Counter, Histogram, Registry, span, spans, timed
+
+def test_counter():
+    registry = Registry()
+    requests = registry.register(Counter('test_requests_total', 'Requests.', ('status',)))
+    requests.inc(status='200')
+    requests.inc(2, status='200')
+    requests.inc(status='404')
+    assert requests.value(status='200') == 3
+    assert registry.render().splitlines() == ['# HELP test_requests_total Requests.',
+                                              '# TYPE test_requests_total counter',
+                                              'test_requests_total{status="200"} 3',
+                                              'test_requests_total{status="404"} 1']
+
+def test_histogram():
+    histogram = Histogram('test_seconds', 'Durations.', ('span',), buckets=(0.1, 1))
+    histogram.observe(0.05, span='a"b')
+    histogram.observe(0.5, span='a"b')
+    histogram.observe(5, span='a"b')
+    assert histogram.count(span='a"b') == 3
+    assert histogram.render()[2:] == ['test_seconds_bucket{span="a\\"b",le="0.1"} 1',
+                                      'test_seconds_bucket{span="a\\"b",le="1"} 2',
+                                      'test_seconds_bucket{span="a\\"b",le="+Inf"} 3',
+                                      'test_seconds_sum{span="a\\"b"} 5.55',
+                                      'test_seconds_count{span="a\\"b"} 3']
+
+def test_spans():
+    @timed('test_timed')
+    def work():
+        time.sleep(0.01)
+    before = spans.count(span='test_timed')
+    work()
+    with span('test_span'):
+        pass
+    assert spans.count(span='test_timed') == before + 1
+    assert spans.count(span='test_span') >= 1
+
+def test_metrics_endpoint():
+    client = dashboard.app.test_client()
+    client.get('/')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'covid_dashboard_requests_total{endpoint="index",status="200"}' in text
+    assert 'covid_dashboard_span_seconds_count{span="render_template"}' in text
+    assert '# TYPE covid_dashboard_request_seconds histogram' in text
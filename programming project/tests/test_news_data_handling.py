@@ -1,5 +1,14 @@
+from datetime import timedelta
+import requests
+import covid_news_handling
 from covid_news_handling import news_API_request
+from covid_news_handling import news_API_requests
 from covid_news_handling import update_news
+from covid_news_handling import ArticleStore
+
+def article(number, published):
+    return {'title': 'Article ' + str(number), 'url': 'https://example.com/' + str(number),
+            'content': '', 'publishedAt': published}
 
 def test_news_API_request():
     assert news_API_request()
@@ -7,3 +16,41 @@ def test_news_API_request():
 
 def test_update_news():
     update_news('test')
+
+def test_news_API_requests(monkeypatch):
+    pages = []
+    def fake_request(covid_terms, from_param, page, page_size):
+        pages.append(page)
+        return {'totalResults': 250, 'articles': [article(page, from_param)]}
+    monkeypatch.setattr(covid_news_handling, 'news_API_request', fake_request)
+    articles = news_API_requests(from_param='2021-12-07T00:00:00', max_pages=5, result_limit=0)
+    assert sorted(pages) == [1, 2, 3]
+    assert [item['title'] for item in articles] == ['Article 1', 'Article 2', 'Article 3']
+    pages.clear()
+    assert len(news_API_requests(max_pages=5, result_limit=100)) == 1
+    assert pages == [1]
+
+def test_news_API_requests_page_fails(monkeypatch):
+    def fake_request(covid_terms, from_param, page, page_size):
+        if page == 2:
+            raise requests.HTTPError('426 Client Error: Upgrade Required')
+        return {'totalResults': 250, 'articles': [article(page, from_param)]}
+    monkeypatch.setattr(covid_news_handling, 'news_API_request', fake_request)
+    articles = news_API_requests(max_pages=5, result_limit=0)
+    assert [item['title'] for item in articles] == ['Article 1', 'Article 3']
+
+def test_article_store(tmp_path):
+    filename = str(tmp_path / 'articles.jsonl')
+    store = ArticleStore(filename, max_articles=3, max_age=timedelta(days=2))
+    assert store.merge([article(1, '2021-12-04T10:00:00Z'), article(2, '2021-12-05T10:00:00Z')]) \
+        == [article(1, '2021-12-04T10:00:00Z'), article(2, '2021-12-05T10:00:00Z')]
+    #Article 1 is now more than two days older than the newest article.
+    assert len(store.merge([article(2, '2021-12-05T10:00:00Z'), article(3, '2021-12-06T10:00:00Z'),
+                            article(4, '2021-12-06T11:00:00Z'), article(5, '2021-12-06T12:00:00Z')])) == 3
+    assert [item['title'] for item in store.articles()] == ['Article 5', 'Article 4', 'Article 3']
+    assert store.latest_published() == '2021-12-06T12:00:00Z'
+    with open(filename, encoding='utf8') as infile:
+        assert len(infile.readlines()) == 5
+    reloaded = ArticleStore(filename, max_articles=3)
+    reloaded.load()
+    assert reloaded.articles() == store.articles()
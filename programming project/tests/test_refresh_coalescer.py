@@ -0,0 +1,24 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from refresh_coalescer import RefreshCoalescer
+
+def test_run_coalesces_concurrent_refreshes():
+    coalescer = RefreshCoalescer(freshness=0)
+    calls = []
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'fetched'
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(lambda i: coalescer.run('news', slow_fetch), range(5)))
+    assert results == ['fetched'] * 5
+    assert len(calls) == 1
+    assert coalescer.stats() == {'news': {'upstream_calls': 1, 'calls_saved': 4}}
+
+def test_run_reuses_fresh_result():
+    coalescer = RefreshCoalescer(freshness=60)
+    assert coalescer.run('covid', lambda: 1) == 1
+    assert coalescer.run('covid', lambda: 2) == 1
+    assert coalescer.run('news', lambda: 3) == 3
+    coalescer.freshness = 0
+    assert coalescer.run('covid', lambda: 4) == 4
@@ -0,0 +1,37 @@
+import app as dashboard
+from shared_state import SharedState
+from dashboard_state import StateHolder
+
+def test_publish_and_read(tmp_path):
+    filename = str(tmp_path / 'state.sqlite3')
+    fetcher = SharedState(filename)
+    worker = SharedState(filename)
+    assert worker.read() == (0, {})
+    version = fetcher.publish({'updates': [{'title': 'Update', 'content': 'Next update at: 10:00'}]})
+    assert version == 1
+    assert worker.read() == (1, {'updates': [{'title': 'Update', 'content': 'Next update at: 10:00'}]})
+    assert worker.read(since=1) is None
+    fetcher.publish({'updates': []})
+    assert worker.version() == 2
+
+def test_commands(tmp_path):
+    filename = str(tmp_path / 'state.sqlite3')
+    fetcher = SharedState(filename)
+    worker = SharedState(filename)
+    worker.send('dismiss_article', 'First')
+    worker.send('remove_update', 'Second')
+    assert fetcher.receive() == [('dismiss_article', ['First']), ('remove_update', ['Second'])]
+    assert fetcher.receive() == []
+
+def test_worker_sends_changes_to_fetcher(tmp_path, monkeypatch):
+    state = SharedState(str(tmp_path / 'state.sqlite3'))
+    monkeypatch.setattr(dashboard, 'shared_state', state)
+    monkeypatch.setattr(dashboard, 'shared_follower', object())
+    monkeypatch.setattr(dashboard, 'shared_version', None)
+    monkeypatch.setattr(dashboard, 'state', StateHolder())
+    state.publish({'area_updates': {}, 'updates': [],
+                   'articles': [{'title': 'Shared article', 'content': 'Read more'}]})
+    client = dashboard.app.test_client()
+    assert b'Shared article' in client.get('/').data
+    client.get('/index?notif=Shared+article')
+    assert state.receive() == [('dismiss_article', ['Shared article'])]
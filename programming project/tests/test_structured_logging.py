@@ -0,0 +1,55 @@
+import json
+import logging
+from structured_logging import RateLimitFilter, setup_logging, stop_logging
+
+def test_structured_fields(tmp_path):
+    logger = logging.getLogger('test_structured_fields')
+    logger.propagate = False
+    listener = setup_logging(str(tmp_path / 'test.log'), 'INFO', logger=logger)
+    logger.info('Update finished.', extra={'update': 'morning', 'area': 'Exeter', 'duration': 0.12345})
+    logger.debug('Not logged.')
+    stop_logging(listener)
+    line = (tmp_path / 'test.log').read_text(encoding='utf8')
+    assert line.endswith(' - test_structured_fields - INFO - Update finished. '
+                         '[update=morning area=Exeter duration=0.123]\n')
+    listener = setup_logging(str(tmp_path / 'test.log'), 'INFO', json_lines=True, logger=logger)
+    logger.info('Update finished.', extra={'update': 'evening'})
+    stop_logging(listener)
+    lines = (tmp_path / 'test.log').read_text(encoding='utf8').splitlines()
+    #The file is added to, not emptied, when logging is set up again.
+    assert len(lines) == 2
+    assert json.loads(lines[1])['update'] == 'evening'
+
+def test_rotation(tmp_path):
+    logger = logging.getLogger('test_rotation')
+    logger.propagate = False
+    listener = setup_logging(str(tmp_path / 'test.log'), max_bytes=200, backup_count=2, rate_limit=0, logger=logger)
+    for number in range(20):
+        logger.info('Row %s', number)
+    stop_logging(listener)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['test.log', 'test.log.1', 'test.log.2']
+    assert 'Row 19' in (tmp_path / 'test.log').read_text(encoding='utf8')
+
+def test_rate_limit():
+    rate_limit = RateLimitFilter(limit=2, interval=60)
+    def record(number, level=logging.DEBUG):
+        return logging.LogRecord('test', level, __file__, 1, 'Row %s', (number,), None)
+    assert [rate_limit.filter(record(number)) for number in range(5)] == [True, True, False, False, False]
+    assert rate_limit.filter(record(5, logging.WARNING))
+    rate_limit.interval = 0
+    passed = record(6)
+    assert rate_limit.filter(passed)
+    assert passed.suppressed == 3
+
+def test_rate_limit_bounded():
+    rate_limit = RateLimitFilter(limit=2, interval=60, max_messages=3)
+    passed = [rate_limit.filter(logging.LogRecord('test', logging.INFO, __file__, 1, '%s: Refresh coalesced.',
+                                                  ('covid ' + str(number),), None)) for number in range(100)]
+    assert passed.count(True) == 2
+    assert len(rate_limit) == 1
+    for number in range(10):
+        rate_limit.filter(logging.LogRecord('test', logging.INFO, __file__, 1, 'Message ' + str(number), (), None))
+    assert len(rate_limit) == 3
+    rate_limit.interval = 0
+    rate_limit.filter(logging.LogRecord('test', logging.INFO, __file__, 1, 'Another message', (), None))
+    assert len(rate_limit) == 1
@@ -0,0 +1,26 @@
+import time
+from threading import Event
+from update_scheduler import UpdateScheduler
+
+def test_enter():
+    scheduler = UpdateScheduler()
+    ran = []
+    done = Event()
+    scheduler.enter(0.1, 'second', lambda: (ran.append('second'), done.set()))
+    scheduler.enter(0.05, 'first', ran.append, ('first',))
+    assert len(scheduler) == 2
+    assert done.wait(2)
+    assert ran == ['first', 'second']
+    assert 'first' not in scheduler
+
+def test_cancel():
+    scheduler = UpdateScheduler()
+    ran = []
+    for i in range(500):
+        scheduler.enter(0.1, 'update ' + str(i), ran.append, (i,))
+    for i in range(1, 500):
+        assert scheduler.cancel('update ' + str(i)) == 1
+    assert scheduler.cancel('update 1') == 0
+    assert len(scheduler) == 1
+    time.sleep(0.3)
+    assert ran == [0]
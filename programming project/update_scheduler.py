@@ -0,0 +1,151 @@
+'''
+Module name: update_scheduler.py
+
+Description:
+    - Module containing the scheduler which runs the scheduled news and covid updates.
+    - One thread waits on a heap of due times, and a small pool of worker threads runs the updates,
+      so hundreds of scheduled updates do not need hundreds of threads.
+
+Last modified on: 18/10/26
+
+Author: Destyny Ho
+'''
+import heapq
+import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Thread
+from metrics import registry, span, Counter, Histogram
+
+lateness = registry.register(Histogram('covid_dashboard_scheduler_lateness_seconds',
+                                       'How long after their due time scheduled updates started, in seconds.'))
+failures = registry.register(Counter('covid_dashboard_scheduled_update_failures_total',
+                                     'Scheduled updates which raised an error.'))
+
+class UpdateScheduler:
+    '''
+    Runs functions after a delay, keeping track of them by update name so they can be cancelled.
+
+    Parameters:
+        - workers (int): Defaultly set to 2; the number of threads running the updates.
+    '''
+    def __init__(self, workers: int = 2):
+        #Each entry is [due time, order added, update name, function, arguments].
+        #Cancelled entries have their function set to None and are dropped when they reach the top.
+        self._queue = []
+        self._entries = {}
+        self._cancelled = 0
+        self._order = itertools.count()
+        self._condition = Condition()
+        self._workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='update')
+        self._thread = None
+
+    def enter(self, delay: float, update_name: str, function, args: tuple = ()) -> list:
+        '''
+        Schedules a function to run after a delay.
+
+        Parameters:
+            - delay (float): The number of seconds to wait.
+            - update_name (string): The name of the update the function belongs to.
+            - function: The function to run.
+            - args (tuple): Defaultly set to (); the arguments to run the function with.
+
+        Returns the scheduled entry.
+        '''
+        entry = [time.monotonic() + delay, next(self._order), update_name, function, args]
+        with self._condition:
+            heapq.heappush(self._queue, entry)
+            self._entries.setdefault(update_name, []).append(entry)
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name='update-scheduler', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return entry
+
+    def cancel(self, update_name: str) -> int:
+        '''
+        Cancels every function scheduled for an update which has not started yet.
+
+        Parameters:
+            - update_name (string): The name of the update.
+
+        Returns the number of functions cancelled.
+        '''
+        with self._condition:
+            entries = self._entries.pop(update_name, [])
+            for entry in entries:
+                entry[3] = None
+            self._cancelled += len(entries)
+            if self._cancelled > len(self._queue) // 2:
+                self._queue = [entry for entry in self._queue if entry[3] is not None]
+                heapq.heapify(self._queue)
+                self._cancelled = 0
+            self._condition.notify()
+        return len(entries)
+
+    def __contains__(self, update_name: str) -> bool:
+        '''
+        Checks whether an update has functions waiting to run.
+
+        Parameters:
+            - update_name (string): The name of the update.
+        '''
+        with self._condition:
+            return update_name in self._entries
+
+    def __len__(self) -> int:
+        '''
+        Gets the number of functions waiting to run.
+        '''
+        with self._condition:
+            return len(self._queue) - self._cancelled
+
+    def _run(self):
+        '''
+        Waits for the next function to be due and hands it to the worker threads.
+        '''
+        while True:
+            with self._condition:
+                while self._queue and self._queue[0][3] is None:
+                    heapq.heappop(self._queue)
+                    self._cancelled -= 1
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+                delay = self._queue[0][0] - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                entry = heapq.heappop(self._queue)
+                due, order, update_name, function, args = entry
+                entries = self._entries[update_name]
+                entries.remove(entry)
+                if not entries:
+                    del self._entries[update_name]
+            self._workers.submit(self._call, update_name, function, args, due)
+
+    @staticmethod
+    def _call(update_name: str, function, args: tuple, due: float = None):
+        '''
+        Runs a scheduled function, logging any error so the worker thread carries on.
+
+        Parameters:
+            - update_name (string): The name of the update the function belongs to.
+            - function: The function to run.
+            - args (tuple): The arguments to run the function with.
+            - due (float): Defaultly set to None; the time.monotonic() time the function was due, for the lateness histogram.
+        '''
+        if due is not None:
+            lateness.observe(time.monotonic() - due)
+        started = time.monotonic()
+        try:
+            with span('scheduled_update'):
+                function(*args)
+        except Exception:
+            failures.inc()
+            logging.exception('%s: Update failed.', update_name,
+                              extra={'update': update_name, 'duration': time.monotonic() - started})
+        else:
+            logging.info('%s: Update finished.', update_name,
+                         extra={'update': update_name, 'duration': time.monotonic() - started})